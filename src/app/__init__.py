@@ -1,16 +1,74 @@
 import os
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, abort, g, render_template, jsonify, make_response, request
+from .logs import configure_logging
+from .metrics import registry, REQUEST_SECONDS
 from .models import ModelManager
+from .jobs import InformationGainJobs
+from .sessions import EvidenceStore
+from datetime import datetime, timezone
+import hashlib
 import json
+import logging
 import re
+import threading
+import time
 
 BASE_DIR = os.path.dirname(__file__)
+# JSON log lines, debug records contain the evidence of every request
+configure_logging(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
+logger = logging.getLogger(__name__)
+# clients which may read the metrics (comma separated addresses, only the local host by default)
+METRICS_ALLOWED_ADDRESSES = os.environ.get('METRICS_ALLOWED_ADDRESSES', '127.0.0.1,::1').split(',')
 
 model_settings = {
     'ADNI': 'ADNI',
     'DELCODE': 'DELCODE'
 }
-model_manager = ModelManager(model_settings)
+model_manager = ModelManager(model_settings, inference_mode='junction_tree',
+                             execution_mode=os.environ.get('EXECUTION_MODE', 'sequential'),
+                             workers_per_model=int(os.environ.get('WORKERS_PER_MODEL', 1)),
+                             latency_budget=float(os.environ['LATENCY_BUDGET']) if 'LATENCY_BUDGET' in os.environ else None,
+                             max_loaded_models=int(os.environ['MAX_LOADED_MODELS']) if 'MAX_LOADED_MODELS' in os.environ else None,
+                             # hot models (comma separated, all served models by default) are loaded in the background
+                             preload=[name for name in os.environ.get('PRELOAD_MODELS', ','.join(model_settings)).split(',') if name])
+# information gain jobs, which run in the background (see ajax.information_gain)
+information_gain_jobs = InformationGainJobs(model_manager, max_workers=int(os.environ.get('INFORMATION_GAIN_WORKERS', 2)))
+# evidence of every session, clients send deltas against it (see ajax.parse_request)
+evidence_store = EvidenceStore(model_manager)
+# cache statistics and memory usage are read by the metrics endpoint
+model_manager.register_metrics(registry)
+
+# data files and templates of the home page, the page is rendered again if one of them changes
+PAGE_FILES = [f'{BASE_DIR}/data/{name}' for name in ('categories.json', 'criteria_settings.json', 'cards.json')] + \
+             [f'{BASE_DIR}/templates/{name}' for name in sorted(os.listdir(f'{BASE_DIR}/templates'))]
+
+
+def load_data_file(name: str) -> any:
+    """Loads a JSON file of the data folder.
+
+    Args:
+        name (str): File name
+
+    Returns:
+        any: File content
+    """
+    with open(f'{BASE_DIR}/data/{name}', 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def validate_categories(category_list: dict[str, dict[str, list[str]]]) -> None:
+    """Checks if all states of all models are listed in the categories and prints the missing ones.
+
+    Args:
+        category_list (dict[str, dict[str, list[str]]]): Categories (states) grouped by model and node
+    """
+    for model in model_manager.models:
+        categories = category_list.get(model.get_name(), {})
+        for node in sorted(model.get_nodes()):
+            missing = [state for state in model.get_state_names(node) if state not in categories.get(node, [])]
+            if missing:
+                logger.warning('States are missing in categories.json', extra={'model': model.get_name(), 'node': node,
+                                                                              'states': missing})
 
 
 def create_app(test_config: any =None) -> Flask:
@@ -39,8 +97,17 @@ def create_app(test_config: any =None) -> Flask:
     except OSError:
         pass
     
-    from . import ajax
+    from . import ajax, api
     app.register_blueprint(ajax.bp)
+    app.register_blueprint(api.bp)
+    model_manager.start_workers()
+    validate_categories(load_data_file('categories.json'))
+    # rendered home page with its version, ETag and modification time
+    home_page = {'version': None}
+
+    if not model_manager.ready and not app.testing:
+        # the production entry point (wsgi.py) warms up before serving, the development server in the background
+        threading.Thread(target=model_manager.warmup, daemon=True).start()
 
 
     @app.template_filter('clean_id')
@@ -51,38 +118,82 @@ def create_app(test_config: any =None) -> Flask:
         return s.strip('_').lower()
 
 
+    @app.before_request
+    def start_timer() -> None:
+        g.start_time = time.perf_counter()
+
+
+    @app.after_request
+    def observe_request(response: Response) -> Response:
+        # streamed responses are observed after their last event (see ajax.stream)
+        if not response.is_streamed and 'start_time' in g:
+            REQUEST_SECONDS.observe(time.perf_counter() - g.start_time, endpoint=request.endpoint,
+                                    method=request.method, status=response.status_code)
+        return response
+
+
     # routes
-    @app.route("/")
-    def home() -> str:
-        """Base page route
+    @app.route("/metrics")
+    def metrics() -> Response:
+        """Metrics route, which returns the latency histograms of this process in the Prometheus text format.
+        Only clients with an address of METRICS_ALLOWED_ADDRESSES may read them.
 
         Returns:
-            str: rendered html template
+            Response: Metrics
         """
-        
+        if request.remote_addr not in METRICS_ALLOWED_ADDRESSES:
+            abort(404)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 
-        with open(f'{BASE_DIR}/data/categories.json', 'r', encoding='utf-8') as file:
-            category_list = json.load(file)
-        for model in model_manager.models:
-            print(f'"{model.get_name()}": ' + '{')
-            for node in sorted(model.get_nodes()):
-                for state in model.get_state_names(node):
-                    if state not in category_list[model.get_name()][node]:
-                        print(node, state)
-                # print(f'"{node}": {sorted(model.get_state_names(node))},')
+    @app.route("/ready")
+    def ready() -> tuple[Response, int]:
+        """Readiness route, which reports if the models are loaded and warmed up.
 
+        Returns:
+            tuple[Response, int]: Warmup state and timings, status 200 if ready, else 503
+        """
+        return jsonify({'ready': model_manager.ready, 'warmup': model_manager.warmup_stats}), 200 if model_manager.ready else 503
 
-        with open(f'{BASE_DIR}/data/criteria_settings.json', 'r', encoding='utf-8') as file:
-            criteria = json.load(file)
 
-        with open(f'{BASE_DIR}/data/cards.json', 'r', encoding='utf-8') as file:
-            cards = json.load(file)
-        network_structure = {}
-        for model in model_manager.models:
-            network_structure[model.get_name()] = model.get_network_structure()
+    def get_home_page() -> dict:
+        """Returns the rendered home page, which is only rendered again if a model or a page file changed.
 
-        return render_template('index.html', criteria=criteria,
+        Returns:
+            dict: 'version', 'html', 'etag' and 'last_modified' of the page
+        """
+        nonlocal home_page
+        page_modified = [os.path.getmtime(path) for path in PAGE_FILES]
+        version = (tuple(model.get_version() for model in model_manager.models), tuple(page_modified))
+        if home_page['version'] == version:
+            return home_page
+
+        # the network structures are loaded by the frontend (see api.network)
+        html = render_template('index.html', criteria=load_data_file('criteria_settings.json'),
                                cases=list(range(1, 6)),
-                               network=network_structure, category_list=category_list, cards=cards)
+                               models=[model.get_name() for model in model_manager.models],
+                               category_list=load_data_file('categories.json'),
+                               cards=load_data_file('cards.json'))
+        last_modified = max(page_modified + [model.modified for model in model_manager.models])
+        # replaced at once, so concurrent requests never see a partially updated page
+        home_page = {'version': version, 'html': html, 'etag': hashlib.sha256(html.encode('utf-8')).hexdigest(),
+                     'last_modified': datetime.fromtimestamp(last_modified, tz=timezone.utc)}
+        return home_page
+
+
+    @app.route("/")
+    def home() -> Response:
+        """Base page route. The page is cached and answered with 304 if the browser's copy is up to date.
+
+        Returns:
+            Response: rendered html template
+        """
+        page = get_home_page()
+        response = make_response(page['html'])
+        response.set_etag(page['etag'])
+        response.last_modified = page['last_modified']
+        # browsers may keep the page, but have to revalidate it
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
 
     return app
\ No newline at end of file
@@ -1,9 +1,14 @@
-from flask import Blueprint, jsonify, request, Response
-from . import model_manager
+from flask import Blueprint, abort, g, jsonify, make_response, request, Response, session, stream_with_context
+from . import model_manager, information_gain_jobs, evidence_store
+from .encoding import dumps, json_response
+from .metrics import REQUEST_SECONDS, SERIALIZATION_SECONDS
+import logging
 import time
 import copy
+import uuid
 
 bp = Blueprint('ajax', __name__, url_prefix='/ajax')
+logger = logging.getLogger(__name__)
 
 
 @bp.route('/', methods=('GET', 'POST'))
@@ -11,60 +16,284 @@ bp = Blueprint('ajax', __name__, url_prefix='/ajax')
 def index(model_name = None) -> str | Response:
     """Ajax route for starting a inference process and retrieving the inference result.
 
+    If the request contains "information_gain": "job", the information gain is computed in the
+    background (see information_gain) and the answer only contains the id of the job
+    ('information_gain_job').
+
+    Requests with a 'delta' instead of the full 'evidence' only get the invalidated results (see
+    parse_request). The version of the stored evidence is sent as 'evidence_version' and in the
+    'X-Evidence-Version' header.
+
+    The results of a request with "format": "compact" contain the state names once per model ('states')
+    and the probabilities of every node as list of integer permille values in this state order.
+    Observed nodes are the index of their state. Responses are compressed if the client accepts it.
+
     Returns:
         str | Response: Returns inference results if accessed via POST, else it returns a string.
     """
     if request.method == 'POST':
         request_data = request.get_json()
-        evidence = request_data['evidence']
-        print('request_data', request_data)
-        print('Evidence 0', evidence)
-
-        if request_data['replace_evidence']:
-            replaced_evidence = replace_evidence(copy.deepcopy(evidence), request_data['replace_evidence'])
-            print('Evidence 1', evidence)
+        logger.debug('Inference request', extra={'request_data': request_data})
+        query = parse_request(request_data, model_name)
+        evidence, model_evidence, session_id = query['evidence'], query['model_evidence'], query['session_id']
 
         ig_results = {}
-        if 'case0' in evidence.keys():
-            start_time = time.time()
-            if request_data['replace_evidence']:
-                for model in model_manager.models:
-                    if model_name == model.get_name():
-                        ig_results[model.get_name()] = model.get_information_gain_of_all_nodes(replaced_evidence['case0'].copy())
-                        print('Evidence 2', replaced_evidence['case0'].copy())
-                    else:
-                        print('Evidence 3', evidence)
-                        ig_results[model.get_name()] = model.get_information_gain_of_all_nodes(evidence['case0'].copy())           
-            else:
-                ig_results = model_manager.get_information_gain(evidence['case0'].copy())
-            print(f'IG: {time.time()-start_time}')
-        start_time = time.time()
-        print(model_name)
-        results = {}
-        if request_data['replace_evidence']:
-            for case in evidence.keys():
-                results[case] = {}
-                for model in model_manager.models:
-                    print(case, model.get_name())
-                    if model_name == model.get_name():
-                        result = model.get_inference(replaced_evidence[case])
-                    else:
-                        result = model.get_inference(evidence[case].copy())        
-                    results[case][model.get_name()] = result
-        else:
-            results = model_manager.get_inference(evidence)
+        ig_job = None
+        if needs_information_gain(query) and request_data.get('information_gain') == 'job':
+            ig_job = submit_information_gain_job(query)
+        elif needs_information_gain(query):
+            ig_results = model_manager.get_information_gain(
+                evidence['case0'].copy(), model_evidence={name: value['case0'] for name, value in model_evidence.items()},
+                session_id=session_id, model_names=query['information_gain_models'])
+        compact = request_data.get('format') == 'compact'
+        report = model_manager.get_inference_report(evidence, model_evidence, session_id, compact, query['selection'])
         answer= {
-            'results': results,
-            'information_gain': ig_results
+            'results': report['results'],
+            'information_gain': ig_results,
+            'evidence_version': query['version']
             }
-        print(f'Inference: {time.time()-start_time}')
+        if compact:
+            answer['format'] = 'compact'
+            answer['states'] = model_manager.get_state_names()
+        if ig_job is not None:
+            answer['information_gain_job'] = ig_job.id
+        if report['approximation']:
+            answer['approximation'] = report['approximation']
+        for key, evidence_key in query['evidence_keys'].items():
+            # the information gain of a job is delivered when the client polls it
+            if ig_job is None or key[0] != 'information_gain':
+                evidence_store.mark_delivered(session_id, key, evidence_key)
 
-        print('Done')
-        return jsonify(answer)
+        response = json_response(answer, request.headers.get('Accept-Encoding', ''))
+        response.headers['X-Evidence-Version'] = str(query['version'])
+        return response
     return 'Nur POST-Anfrage möglich'
 
 
 
+@bp.route('/stream', methods=('POST',))
+@bp.route('/stream/<model_name>', methods=('POST',))
+def stream(model_name = None) -> Response:
+    """Ajax route like index, which streams every (case, model) result as soon as it is done and the
+    information gain of every model afterwards. The version of the stored evidence is sent in the
+    'X-Evidence-Version' header.
+
+    The events are sent as newline delimited JSON or as server-sent events (if the client accepts
+    'text/event-stream'). Every event has a 'type': 'states' (state names, only in the compact format),
+    'information_gain_job' ('job_id', first event if the request contains "information_gain": "job"),
+    'result' ('case', 'model', 'result' and 'approximation' for approximate results),
+    'information_gain' ('model' and 'information_gain'), 'error' ('message') and 'done' as last event.
+
+    Returns:
+        Response: Streamed inference results
+    """
+    request_data = request.get_json()
+    query = parse_request(request_data, model_name)
+    evidence, model_evidence, session_id = query['evidence'], query['model_evidence'], query['session_id']
+    compact = request_data.get('format') == 'compact'
+    event_stream = 'text/event-stream' in request.headers.get('Accept', '')
+    start_time = g.get('start_time', time.perf_counter())
+
+    def format_event(event: dict) -> bytes:
+        with SERIALIZATION_SECONDS.time(format='sse' if event_stream else 'ndjson'):
+            if event_stream:
+                return b'event: ' + event['type'].encode('utf-8') + b'\ndata: ' + dumps(event) + b'\n\n'
+            return dumps(event) + b'\n'
+
+    def generate():
+        try:
+            ig_job = None
+            if needs_information_gain(query) and request_data.get('information_gain') == 'job':
+                # the information gain is computed in the background while the results are streamed
+                ig_job = submit_information_gain_job(query)
+                yield format_event({'type': 'information_gain_job', 'job_id': ig_job.id})
+            if compact:
+                yield format_event({'type': 'states', 'states': model_manager.get_state_names()})
+            for case, name, result, intervals in model_manager.iter_inference(evidence, model_evidence, session_id,
+                                                                              compact, query['selection']):
+                event = {'type': 'result', 'case': case, 'model': name, 'result': result}
+                if intervals is not None:
+                    event['approximation'] = intervals
+                yield format_event(event)
+                # only results which reached the client count as delivered (the client may disconnect)
+                evidence_store.mark_delivered(session_id, (case, name), query['evidence_keys'][(case, name)])
+            if needs_information_gain(query) and ig_job is None:
+                for name, ig in model_manager.iter_information_gain(
+                        evidence['case0'].copy(), model_evidence={name: value['case0'] for name, value in model_evidence.items()},
+                        session_id=session_id, model_names=query['information_gain_models']):
+                    yield format_event({'type': 'information_gain', 'model': name, 'information_gain': ig})
+                    evidence_store.mark_delivered(session_id, ('information_gain', name),
+                                                  query['evidence_keys'][('information_gain', name)])
+        except Exception as error:
+            # the status code has already been sent
+            logger.exception('Stream failed', extra={'session_id': session_id})
+            yield format_event({'type': 'error', 'message': str(error)})
+        yield format_event({'type': 'done'})
+        # the request handler returned before the first event, the request ends with the last event
+        REQUEST_SECONDS.observe(time.perf_counter() - start_time, endpoint=request.endpoint, method=request.method, status=200)
+
+    response = Response(stream_with_context(generate()),
+                        mimetype='text/event-stream' if event_stream else 'application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    # proxies must not buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['X-Evidence-Version'] = str(query['version'])
+    return response
+
+
+@bp.route('/information_gain', methods=('POST',))
+@bp.route('/information_gain/<model_name>', methods=('POST',))
+def information_gain(model_name = None) -> tuple[Response, int]:
+    """Ajax route which starts a background job for the information gain of 'case0' (request data like
+    index). A previous job of the same session is cancelled.
+
+    Requests with "information_gain": "inline" and the full 'evidence' get the information gain
+    directly. Clients use this if their job is unknown, because jobs live in the memory of the
+    worker which started them. The evidence of the session is not changed.
+
+    Returns:
+        tuple[Response, int]: Job (see information_gain_job) and status 202, information gain and
+            status 200 for inline requests, status 400 without 'case0'
+    """
+    request_data = request.get_json()
+    if request_data.get('information_gain') == 'inline':
+        evidence = request_data.get('evidence') or {}
+        if 'case0' not in evidence.keys():
+            return jsonify({'error': 'The information gain is only computed for "case0"'}), 400
+        model_evidence = {}
+        if request_data.get('replace_evidence'):
+            model_evidence[model_name] = replace_evidence(copy.deepcopy(evidence), request_data['replace_evidence'])
+        try:
+            ig_results = model_manager.get_information_gain(
+                evidence['case0'].copy(), model_evidence={name: value['case0'] for name, value in model_evidence.items()})
+        except ValueError as error:
+            return jsonify({'error': str(error)}), 400
+        return jsonify({'information_gain': ig_results}), 200
+    query = parse_request(request_data, model_name)
+    if 'case0' not in query['evidence'].keys():
+        return jsonify({'error': 'The information gain is only computed for "case0"'}), 400
+    return jsonify(submit_information_gain_job(query).to_dict()), 202
+
+
+@bp.route('/information_gain/jobs/<job_id>', methods=('GET', 'DELETE'))
+def information_gain_job(job_id: str) -> Response:
+    """Ajax route for polling (GET) or cancelling (DELETE) an information gain job of the session.
+
+    Args:
+        job_id (str): Job id
+
+    Returns:
+        Response: Job id, status (one of jobs.JOB_STATES), information gain of the finished models and error message
+    """
+    job = information_gain_jobs.get(job_id)
+    if job is None or job.session_id != session.get('session_id'):
+        abort(404)
+    if request.method == 'DELETE':
+        job.cancel()
+    state = job.to_dict()
+    # only results which reach the client count as delivered, results of superseded jobs are ignored by it
+    if request.method == 'GET' and information_gain_jobs.is_current(job):
+        for name in state['information_gain']:
+            if name in job.evidence_keys:
+                evidence_store.mark_delivered(job.session_id, ('information_gain', name), job.evidence_keys[name])
+    return jsonify(state)
+
+
+def needs_information_gain(query: dict) -> bool:
+    """Checks if the information gain of a request has to be computed.
+
+    Args:
+        query (dict): Parsed request (see parse_request)
+
+    Returns:
+        bool: True if the request contains 'case0' and the information gain of at least one model is invalidated
+    """
+    return 'case0' in query['evidence'].keys() and query['information_gain_models'] != []
+
+
+def submit_information_gain_job(query: dict):
+    """Submits the information gain job of 'case0'.
+
+    Args:
+        query (dict): Parsed request (see parse_request)
+
+    Returns:
+        InformationGainJob: Submitted job
+    """
+    evidence, model_evidence = query['evidence'], query['model_evidence']
+    # the results are marked as delivered when the client polls them (see information_gain_job)
+    return information_gain_jobs.submit(query['session_id'], evidence['case0'].copy(),
+                                        model_evidence={name: value['case0'] for name, value in model_evidence.items()},
+                                        model_names=query['information_gain_models'],
+                                        evidence_keys={key[1]: evidence_key for key, evidence_key in query['evidence_keys'].items()
+                                                       if key[0] == 'information_gain'})
+
+
+def parse_request(request_data: dict, model_name: str | None) -> dict:
+    """Reads the evidence of an inference request and stores it for the session. The request contains
+    either the full 'evidence' (grouped by case) or a 'delta' against the stored evidence together
+    with the 'evidence_version' it is based on (see EvidenceStore.apply_delta). Only the results and
+    information gains which a delta invalidates are computed again.
+
+    Aborts with status 409 if the stored evidence is unknown or has another version (the client has
+    to send the full evidence) and with status 400 if the delta or the evidence is invalid.
+
+    Args:
+        request_data (dict): Request data with 'evidence' or 'delta' and 'evidence_version' and 'replace_evidence'
+        model_name (str | None): Model of the what-if feature
+
+    Returns:
+        dict: 'evidence' grouped by case, 'model_evidence' (evidence of the model with a replaced (what-if)
+            feature grouped by model), 'session_id', 'version' of the stored evidence, 'evidence_keys'
+            (canonical evidence of the computed results, see EvidenceStore.get_evidence_keys),
+            'selection' ((case, model) pairs to compute, None for all) and 'information_gain_models'
+            (models whose information gain is computed, None for all)
+    """
+    # what-if requests are updated incrementally from the previous request of the same session
+    session_id = session.setdefault('session_id', uuid.uuid4().hex)
+
+    is_delta = 'delta' in request_data
+    if is_delta:
+        try:
+            stored = evidence_store.apply_delta(session_id, request_data.get('evidence_version'), request_data['delta'])
+        except ValueError as error:
+            abort(make_response(jsonify({'error': str(error)}), 400))
+        if stored is None:
+            abort(make_response(jsonify({'error': 'Unknown evidence version, the full evidence is required'}), 409))
+    else:
+        stored = evidence_store.set_evidence(session_id, request_data['evidence'])
+    evidence, version = stored
+    logger.debug('Evidence', extra={'session_id': session_id, 'evidence': evidence, 'evidence_version': version})
+
+    # evidence of the model with a replaced (what-if) feature
+    model_evidence = {}
+    if request_data.get('replace_evidence'):
+        model_evidence[model_name] = replace_evidence(copy.deepcopy(evidence), request_data['replace_evidence'])
+        logger.debug('What-if evidence', extra={'session_id': session_id, 'model': model_name,
+                                                'replace_evidence': request_data['replace_evidence']})
+
+    try:
+        evidence_keys = evidence_store.get_evidence_keys(evidence, model_evidence)
+    except ValueError as error:
+        # e.g. a value of a numeric node which is not a number
+        abort(make_response(jsonify({'error': str(error)}), 400))
+    selection = None
+    information_gain_models = None
+    if is_delta:
+        evidence_keys = evidence_store.get_invalidated(session_id, evidence_keys)
+        selection = {key for key in evidence_keys if key[0] != 'information_gain'}
+        information_gain_models = [key[1] for key in evidence_keys if key[0] == 'information_gain']
+    return {
+        'evidence': evidence,
+        'model_evidence': model_evidence,
+        'session_id': session_id,
+        'version': version,
+        'evidence_keys': evidence_keys,
+        'selection': selection,
+        'information_gain_models': information_gain_models,
+    }
+
+
 def replace_evidence(evidence, replace_evidence):
     case_id = replace_evidence['case_id']
     feature_name = replace_evidence['feature']
@@ -0,0 +1,36 @@
+from flask import Blueprint, Response, abort, request
+from . import model_manager
+import hashlib
+import json
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+# serialized network structure and its ETag grouped by model name and model version
+network_payloads: dict[tuple[str, str], tuple[str, str]] = {}
+
+
+@bp.route('/network/<model_name>')
+def network(model_name: str) -> Response:
+    """Route for the structure of a bayesian network (nodes with their group and links). The structure is
+    serialized once per model version and answered with 304 if the browser's copy is up to date.
+
+    Args:
+        model_name (str): Model name
+
+    Returns:
+        Response: Model version and structure of the bayesian network
+    """
+    try:
+        metadata = model_manager.get_model_metadata(model_name)
+    except KeyError:
+        abort(404)
+    key = (model_name, metadata.get_version())
+    if key not in network_payloads:
+        payload = json.dumps({'model': model_name, 'version': metadata.get_version(), **metadata.get_network_structure()})
+        network_payloads[key] = (payload, hashlib.sha256(payload.encode('utf-8')).hexdigest())
+    payload, etag = network_payloads[key]
+    response = Response(payload, mimetype='application/json')
+    response.set_etag(etag)
+    # browsers may keep the structure, but have to revalidate it
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
@@ -0,0 +1,213 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+import numpy as np
+
+
+class PosteriorCache:
+    """Thread-safe LRU cache for posterior distributions, bounded by number of entries and bytes.
+
+    Every entry holds the posteriors (node -> probabilities) which were computed for one evidence set.
+    """
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024**2):
+        """Initializes the cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of cached evidence sets. Defaults to 1024.
+            max_bytes (int, optional): Maximum size of all cached probability arrays. Defaults to 64 MiB.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, dict[str, np.ndarray]] = OrderedDict()
+        self.entry_bytes: dict[tuple, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+
+    def get(self, key: tuple, nodes: list[str]) -> dict[str, np.ndarray]:
+        """Returns the cached posteriors of an evidence set and marks them as recently used.
+        The lookup counts as hit if the posteriors of all requested nodes are cached.
+
+        Args:
+            key (tuple): Canonical (encoded) evidence
+            nodes (list[str]): Requested nodes
+
+        Returns:
+            dict[str, np.ndarray]: Cached posteriors grouped by node (may be incomplete or empty)
+        """
+        with self.lock:
+            posteriors = self.entries.get(key)
+            if posteriors is None:
+                self.misses += 1
+                return {}
+            self.entries.move_to_end(key)
+            if all(node in posteriors for node in nodes):
+                self.hits += 1
+            else:
+                self.misses += 1
+            return posteriors
+
+
+    def put(self, key: tuple, posteriors: dict[str, np.ndarray]) -> None:
+        """Adds posteriors of an evidence set. Already cached posteriors of the same evidence set are kept.
+
+        Args:
+            key (tuple): Canonical (encoded) evidence
+            posteriors (dict[str, np.ndarray]): Posteriors grouped by node
+        """
+        for values in posteriors.values():
+            values.flags.writeable = False
+        with self.lock:
+            # entries are replaced instead of updated, so returned entries never change
+            entry = {**self.entries.get(key, {}), **posteriors}
+            self.bytes -= self.entry_bytes.get(key, 0)
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self.entry_bytes[key] = sum(values.nbytes for values in entry.values())
+            self.bytes += self.entry_bytes[key]
+            while len(self.entries) > 1 and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+                evicted_key, _ = self.entries.popitem(last=False)
+                self.bytes -= self.entry_bytes.pop(evicted_key)
+                self.evictions += 1
+
+
+    def clear(self) -> None:
+        """Removes all entries (the counters are kept).
+        """
+        with self.lock:
+            self.entries.clear()
+            self.entry_bytes.clear()
+            self.bytes = 0
+
+
+    def get_stats(self) -> dict[str, int | float]:
+        """Returns the cache statistics.
+
+        Returns:
+            dict[str, int | float]: Hits, misses, hit rate, evictions, number of entries and bytes
+        """
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+            }
+
+
+class SingleFlight:
+    """Coalesces identical concurrent computations: the first caller of a key computes the result,
+    all callers which arrive while it is in flight wait for it and share the result.
+
+    Results are shared, not copied, so callers must not modify them.
+    """
+    def __init__(self):
+        """Initializes the map of computations in flight.
+        """
+        # key -> [future, number of callers which wait for the future]
+        self.calls: dict[tuple, list] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        # reentrant, because cancelling a future runs its callbacks (forget) right away
+        self.lock = threading.RLock()
+
+
+    def run(self, key: tuple, function, *args):
+        """Runs a function in the calling thread or waits for the identical call in flight.
+
+        Args:
+            key (tuple): Canonical key of the call
+            function (Callable): Function
+            *args: Arguments of the function
+
+        Returns:
+            Any: Result of the function (exceptions are raised for all callers)
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+            else:
+                self.leaders += 1
+                future = Future()
+                self.calls[key] = [future, 1]
+        if call is not None:
+            return call[0].result()
+        try:
+            future.set_result(function(*args))
+        except BaseException as error:
+            future.set_exception(error)
+        finally:
+            self.forget(key, future)
+        return future.result()
+
+
+    def submit(self, key: tuple, submit) -> Future:
+        """Submits a computation (e.g. to a thread or process pool) or joins the identical one in flight.
+        Every returned future has to be released with release.
+
+        Args:
+            key (tuple): Canonical key of the computation
+            submit (Callable): Function without arguments which submits the computation and returns its future
+
+        Returns:
+            Future: Future of the result
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                call[1] += 1
+                return call[0]
+            self.leaders += 1
+            future = submit()
+            self.calls[key] = [future, 1]
+        future.add_done_callback(lambda done: self.forget(key, done))
+        return future
+
+
+    def release(self, key: tuple, future: Future) -> None:
+        """Releases a future of submit. A computation which is not started yet is cancelled as soon
+        as no caller waits for it anymore.
+
+        Args:
+            key (tuple): Canonical key of the computation
+            future (Future): Future returned by submit
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None or call[0] is not future:
+                # already done
+                return
+            call[1] -= 1
+            if call[1] == 0:
+                future.cancel()
+
+
+    def forget(self, key: tuple, future: Future) -> None:
+        """Removes a finished computation, so later calls compute the key again.
+
+        Args:
+            key (tuple): Canonical key of the computation
+            future (Future): Future of the computation
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None and call[0] is future:
+                del self.calls[key]
+
+
+    def get_stats(self) -> dict[str, int]:
+        """Returns how many computations ran and how many calls were coalesced.
+
+        Returns:
+            dict[str, int]: Computations in flight, computed and coalesced calls
+        """
+        with self.lock:
+            return {'in_flight': len(self.calls), 'computed': self.leaders, 'coalesced': self.coalesced}
@@ -0,0 +1,238 @@
+from collections import OrderedDict
+import itertools
+import string
+import threading
+import numpy as np
+from .model_view import ModelView
+from .relevance import RelevanceReducer
+
+
+class ContractionPlan:
+    """Precomputed contraction path for one (query variables, evidence variables) pattern.
+    """
+    def __init__(self, factor_indices: list[int], constant_indices: list[int],
+                 steps: list[tuple[list[int], str]], final_subscripts: str):
+        """Initializes the plan.
+
+        Args:
+            factor_indices (list[int]): Factors taking part in the contraction (in operand order)
+            constant_indices (list[int]): Factors whose variables are all observed
+            steps (list[tuple[list[int], str]]): Contractions as (operand indices, einsum subscripts), each
+                summing out one variable. The result of each step is appended to the operand list.
+            final_subscripts (str): Einsum subscripts which multiply the remaining operands in query order
+        """
+        self.factor_indices = factor_indices
+        self.constant_indices = constant_indices
+        self.steps = steps
+        self.final_subscripts = final_subscripts
+
+
+class EinsumEngine:
+    """Exact inference engine, which evaluates queries as cached contraction paths of dense NumPy arrays.
+
+    The CPDs are converted to arrays once. Evidence is applied by slicing the arrays and every
+    (query variables, evidence variables) pattern gets its own contraction plan, which is computed once.
+    """
+    def __init__(self, view: ModelView, relevance: RelevanceReducer | None = None, max_plans: int = 4096):
+        """Collects the CPDs of a model as dense arrays.
+
+        Args:
+            view (ModelView): View of the fitted bayesian network
+            relevance (RelevanceReducer | None, optional): If given, plans only contain the CPDs of the
+                minimal sub-network of the query. Defaults to None.
+            max_plans (int, optional): Maximum number of cached contraction plans, the least recently
+                used plan is removed. Defaults to 4096.
+        """
+        self.relevance = relevance
+        self.nodes: list[str] = list(view.nodes)
+        self.cardinality = view.cardinality
+        self.factors: list[tuple[tuple[str, ...], np.ndarray]] = [((node, *view.parents[node]), view.tables[node])
+                                                                  for node in self.nodes]
+        self.max_plans = max_plans
+        self.plans: OrderedDict[tuple[tuple[str, ...], frozenset[str]], ContractionPlan] = OrderedDict()
+        self.plan_hits = 0
+        self.plan_misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+
+    def query(self, variables: list[str], evidence: dict[str, int]) -> np.ndarray:
+        """Returns the joint posterior distribution of the query variables.
+
+        Args:
+            variables (list[str]): Query variables
+            evidence (dict[str, int]): Evidence as node -> state index
+
+        Returns:
+            np.ndarray: Posterior with one axis per query variable (ordered like the state names)
+        """
+        overlap = set(variables) & set(evidence)
+        if overlap:
+            raise ValueError(f"Can't have the same variables in both `variables` and `evidence`. Found in both: {overlap}")
+        plan = self.get_plan(tuple(variables), frozenset(evidence))
+        operands = [self.reduce_factor(index, evidence) for index in plan.factor_indices]
+        for indices, subscripts in plan.steps:
+            result = np.einsum(subscripts, *[operands[index] for index in indices])
+            operands = [operand for index, operand in enumerate(operands) if index not in indices]
+            operands.append(result)
+        result = np.einsum(plan.final_subscripts, *operands)
+
+        # factors which are completely observed are constants, only their product matters
+        constant = 1.0
+        for index in plan.constant_indices:
+            constant *= float(self.reduce_factor(index, evidence))
+        result = result * constant
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return result / result.sum()
+
+
+    def reduce_factor(self, factor_index: int, evidence: dict[str, int]) -> np.ndarray:
+        """Slices the evidence states out of a factor.
+
+        Args:
+            factor_index (int): Index of the factor
+            evidence (dict[str, int]): Evidence as node -> state index
+
+        Returns:
+            np.ndarray: Factor without the axes of the observed variables
+        """
+        variables, values = self.factors[factor_index]
+        index = tuple(evidence[variable] if variable in evidence else slice(None) for variable in variables)
+        return values[index]
+
+
+    def get_plan(self, variables: tuple[str, ...], evidence_variables: frozenset[str]) -> ContractionPlan:
+        """Returns the (cached) contraction plan of a query pattern.
+
+        Args:
+            variables (tuple[str, ...]): Query variables
+            evidence_variables (frozenset[str]): Observed variables
+
+        Returns:
+            ContractionPlan: Contraction plan
+        """
+        key = (variables, evidence_variables)
+        with self.lock:
+            plan = self.plans.get(key)
+            if plan is None:
+                self.plan_misses += 1
+            else:
+                self.plan_hits += 1
+                self.plans.move_to_end(key)
+        if plan is None:
+            plan = self._build_plan(variables, evidence_variables)
+            with self.lock:
+                self.plans[key] = plan
+                while len(self.plans) > self.max_plans:
+                    self.plans.popitem(last=False)
+                    self.evictions += 1
+        return plan
+
+
+    def _build_plan(self, variables: tuple[str, ...], evidence_variables: frozenset[str]) -> ContractionPlan:
+        """Computes a contraction plan with the greedy min-fill heuristic: every step sums out one
+        variable by contracting all operands which contain it.
+
+        Args:
+            variables (tuple[str, ...]): Query variables
+            evidence_variables (frozenset[str]): Observed variables
+
+        Returns:
+            ContractionPlan: Contraction plan
+        """
+        factor_nodes = set(self.nodes)
+        if self.relevance is not None:
+            factor_nodes = self.relevance.get_relevant_network(variables, evidence_variables).factor_nodes
+        factor_indices = []
+        constant_indices = []
+        operands: list[tuple[str, ...]] = []
+        for index, (factor_variables, _) in enumerate(self.factors):
+            if self.nodes[index] not in factor_nodes:
+                continue
+            remaining = tuple(variable for variable in factor_variables if variable not in evidence_variables)
+            if remaining:
+                factor_indices.append(index)
+                operands.append(remaining)
+            else:
+                constant_indices.append(index)
+
+        # interaction graph of the remaining variables
+        graph: dict[str, set[str]] = {}
+        for operand in operands:
+            for variable in operand:
+                graph.setdefault(variable, set()).update(v for v in operand if v != variable)
+
+        def elimination_cost(variable: str) -> tuple[int, int, str]:
+            neighbours = graph[variable]
+            fill_in = sum(1 for u, v in itertools.combinations(neighbours, 2) if v not in graph[u])
+            return fill_in, self._size(tuple(neighbours | {variable})), variable
+
+        # greedy min-fill elimination (ties broken by array size)
+        eliminate = set(graph) - set(variables)
+        steps = []
+        while eliminate:
+            variable = min(eliminate, key=elimination_cost)
+            eliminate.remove(variable)
+            neighbours = graph.pop(variable)
+            for u, v in itertools.combinations(neighbours, 2):
+                graph[u].add(v)
+                graph[v].add(u)
+            for neighbour in neighbours:
+                graph[neighbour].discard(variable)
+
+            indices = [index for index, operand in enumerate(operands) if variable in operand]
+            result = tuple(v for v in dict.fromkeys(v for index in indices for v in operands[index]) if v != variable)
+            steps.append((indices, self._subscripts([operands[index] for index in indices], result)))
+            operands = [operand for index, operand in enumerate(operands) if index not in indices]
+            operands.append(result)
+
+        final_subscripts = self._subscripts(operands, variables)
+        return ContractionPlan(factor_indices, constant_indices, steps, final_subscripts)
+
+
+    def _size(self, variables: tuple[str, ...]) -> int:
+        """Returns the number of entries of an array over the given variables.
+
+        Args:
+            variables (tuple[str, ...]): Variables
+
+        Returns:
+            int: Number of entries
+        """
+        return int(np.prod([self.cardinality[variable] for variable in variables]))
+
+
+    @staticmethod
+    def _subscripts(inputs: list[tuple[str, ...]], output: tuple[str, ...]) -> str:
+        """Builds einsum subscripts with letters local to one contraction.
+
+        Args:
+            inputs (list[tuple[str, ...]]): Variables of every input operand
+            output (tuple[str, ...]): Variables of the result
+
+        Returns:
+            str: Einsum subscripts
+        """
+        letters = {}
+        for variable in [variable for operand in inputs for variable in operand] + list(output):
+            if variable not in letters:
+                letters[variable] = string.ascii_letters[len(letters)]
+        terms = [''.join(letters[variable] for variable in operand) for operand in inputs]
+        return ','.join(terms) + '->' + ''.join(letters[variable] for variable in output)
+
+
+    def get_stats(self) -> dict[str, int | float]:
+        """Returns the plan cache statistics.
+
+        Returns:
+            dict[str, int | float]: Number of cached plans, plan hits, plan misses, hit rate and evictions
+        """
+        with self.lock:
+            requests = self.plan_hits + self.plan_misses
+            return {
+                'plans': len(self.plans),
+                'hits': self.plan_hits,
+                'misses': self.plan_misses,
+                'hit_rate': self.plan_hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,86 @@
+import gzip
+import json
+import numpy as np
+from flask import Response
+from .metrics import SERIALIZATION_SECONDS
+
+# optional faster serializer and better compression, the standard library is used without them
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# smaller responses are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def to_permille(posterior: np.ndarray) -> list[int]:
+    """Converts a posterior distribution to integer permille values (compact response format).
+
+    Args:
+        posterior (np.ndarray): Posterior distribution (ordered like the state names)
+
+    Returns:
+        list[int]: Probabilities in permille
+    """
+    # estimates without any weighted sample are NaN
+    return np.rint(np.nan_to_num(posterior) * 1000).astype(int).tolist()
+
+
+def dumps(payload: dict) -> bytes:
+    """Serializes a payload as JSON.
+
+    Args:
+        payload (dict): Payload, may contain NumPy scalars and arrays
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(',', ':'), default=lambda value: value.tolist()).encode('utf-8')
+
+
+def compress(body: bytes, accept_encoding: str) -> tuple[bytes, str | None]:
+    """Compresses a response body with the best content coding the client accepts.
+
+    Args:
+        body (bytes): Response body
+        accept_encoding (str): Accept-Encoding header of the request
+
+    Returns:
+        tuple[bytes, str | None]: (Compressed) body and its content coding, None if it is not compressed
+    """
+    if len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    codings = {coding.split(';')[0].strip().lower() for coding in accept_encoding.split(',')}
+    if brotli is not None and 'br' in codings:
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if 'gzip' in codings:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
+    return body, None
+
+
+def json_response(payload: dict, accept_encoding: str = '') -> Response:
+    """Builds a (compressed) JSON response.
+
+    Args:
+        payload (dict): Payload
+        accept_encoding (str, optional): Accept-Encoding header of the request. Defaults to ''.
+
+    Returns:
+        Response: JSON response
+    """
+    with SERIALIZATION_SECONDS.time(format='json'):
+        body, coding = compress(dumps(payload), accept_encoding)
+    response = Response(body, mimetype='application/json')
+    if coding is not None:
+        response.headers['Content-Encoding'] = coding
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,14 @@
+"""Gunicorn settings of the production entry point (app.wsgi:app). All settings can be changed with
+environment variables.
+"""
+import os
+
+bind = f'0.0.0.0:{os.environ.get("PORT", "5000")}'
+# prefork web workers, each with a thread pool for concurrent requests
+workers = int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+# load and warm up the models once in the master process, the workers share them copy-on-write
+preload_app = True
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+accesslog = '-'
@@ -0,0 +1,117 @@
+import bisect
+import numpy as np
+import pandas as pd
+
+# src/app/intervals.py and src/data-processing/model_building/IntervalIndex.py are identical copies, because the
+# web app image only contains src/app (tests/test_intervals.py checks that they stay the same)
+
+
+class IntervalIndex:
+    """Sorted interval edges of one numeric node, which map values to their interval state with binary search.
+    """
+    def __init__(self, intervals: list[pd.Interval]):
+        """Builds the edge arrays of the intervals.
+
+        Args:
+            intervals (list[pd.Interval]): Intervals of the node (in state order)
+        """
+        order = sorted(range(len(intervals)), key=lambda index: (intervals[index].left, index))
+        self.order = np.array(order, dtype=int)
+        self.interval_list = [intervals[index] for index in order]
+        self.left_edges = [float(interval.left) for interval in self.interval_list]
+        self.names = np.array([str(intervals[index]) for index in order], dtype=object)
+        self.lefts = np.array([intervals[index].left for index in order], dtype=float)
+        self.rights = np.array([intervals[index].right for index in order], dtype=float)
+        self.closed_left = np.array([intervals[index].closed_left for index in order], dtype=bool)
+        self.closed_right = np.array([intervals[index].closed_right for index in order], dtype=bool)
+        # binary search only finds the first matching interval (in state order) if no intervals overlap
+        touching = self.closed_right[:-1] & self.closed_left[1:]
+        self.disjoint = bool(np.all((self.rights[:-1] < self.lefts[1:]) | ((self.rights[:-1] == self.lefts[1:]) & ~touching)))
+
+
+    def __len__(self) -> int:
+        """Returns the number of intervals.
+
+        Returns:
+            int: Number of intervals
+        """
+        return len(self.names)
+
+
+    def contains(self, positions: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Checks if values lie in the intervals at the given (sorted) positions.
+
+        Args:
+            positions (np.ndarray): Positions of the intervals, -1 for no interval
+            values (np.ndarray): Values
+
+        Returns:
+            np.ndarray: True where the value lies in its interval
+        """
+        valid = positions >= 0
+        positions = np.where(valid, positions, 0)
+        lefts = self.lefts[positions]
+        rights = self.rights[positions]
+        above_left = (values > lefts) | (self.closed_left[positions] & (values == lefts))
+        below_right = (values < rights) | (self.closed_right[positions] & (values == rights))
+        return valid & above_left & below_right
+
+
+    def get_positions(self, values: np.ndarray) -> np.ndarray:
+        """Returns the (sorted) positions of the intervals which contain the values.
+
+        Args:
+            values (np.ndarray): Values
+
+        Returns:
+            np.ndarray: Positions of the intervals, -1 if no interval contains the value
+        """
+        if len(self) == 0:
+            return np.full(values.shape, -1)
+        if not self.disjoint:
+            # overlapping intervals: the first interval in state order wins, like a linear scan
+            contained = [self.contains(np.full(values.shape, position), values) for position in range(len(self))]
+            positions = np.full(values.shape, -1)
+            for position in np.argsort(self.order)[::-1]:
+                positions = np.where(contained[position], position, positions)
+            return positions
+        positions = np.searchsorted(self.lefts, values, side='right') - 1
+        # a value on the open left edge of an interval belongs to the previous interval
+        positions = np.where(self.contains(positions, values), positions, positions - 1)
+        return np.where(self.contains(positions, values), positions, -1)
+
+
+    def convert(self, value: float) -> str | None:
+        """Converts a numeric value to the state name of its interval.
+
+        Args:
+            value (float): Value
+
+        Returns:
+            str | None: Interval as string, None if no interval contains the value
+        """
+        if not self.disjoint:
+            position = int(self.get_positions(np.array([value], dtype=float))[0])
+            return self.names[position] if position >= 0 else None
+        # plain bisect is faster than NumPy for single values
+        position = bisect.bisect_right(self.left_edges, value) - 1
+        for candidate in (position, position - 1):
+            if candidate >= 0 and value in self.interval_list[candidate]:
+                return self.names[candidate]
+        return None
+
+
+    def convert_array(self, values: np.ndarray) -> np.ndarray:
+        """Converts numeric values to the state names of their intervals.
+
+        Args:
+            values (np.ndarray): Values (NaN for missing values)
+
+        Returns:
+            np.ndarray: Intervals as strings (object array), None where no interval contains the value
+        """
+        values = np.asarray(values, dtype=float)
+        positions = self.get_positions(values)
+        names = np.full(values.shape, None, dtype=object)
+        names[positions >= 0] = self.names[positions[positions >= 0]]
+        return names
@@ -0,0 +1,221 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+import time
+import uuid
+
+JOB_STATES = ['queued', 'running', 'done', 'cancelled', 'failed']
+logger = logging.getLogger(__name__)
+
+
+class InformationGainJob:
+    """Information gain computation of one session, which runs in the background.
+    """
+    def __init__(self, session_id: str, evidence: dict, target_node: str, model_evidence: dict[str, dict],
+                 model_names: list[str] | None = None, evidence_keys: dict[str, tuple] | None = None):
+        """Initializes a queued job.
+
+        Args:
+            session_id (str): Session which submitted the job
+            evidence (dict): Evidence of the case
+            target_node (str): Target node
+            model_evidence (dict[str, dict]): Evidence which replaces the evidence for single models
+            model_names (list[str] | None, optional): Models whose information gain is computed. Defaults to None (all models).
+            evidence_keys (dict[str, tuple] | None, optional): Canonical evidence of the information gain
+                grouped by model (see EvidenceStore.get_evidence_keys). Defaults to None.
+        """
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.evidence = evidence
+        self.target_node = target_node
+        self.model_evidence = model_evidence
+        self.model_names = model_names
+        self.evidence_keys = evidence_keys or {}
+        self.status = 'queued'
+        self.result: dict[str, dict[str, float]] = {}
+        self.error: str | None = None
+        self.created = time.time()
+        self.finished: float | None = None
+        self.cancel_event = threading.Event()
+        self.future: Future | None = None
+
+
+    def cancel(self) -> None:
+        """Cancels the job. A running job stops before its next model.
+        """
+        self.cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            self.finish('cancelled')
+
+
+    def finish(self, status: str, error: str | None = None) -> None:
+        """Marks the job as finished.
+
+        Args:
+            status (str): Final state ('done', 'cancelled' or 'failed')
+            error (str | None, optional): Error message of failed jobs. Defaults to None.
+        """
+        self.status = status
+        self.error = error
+        self.finished = time.time()
+
+
+    def is_finished(self) -> bool:
+        """Checks if the job is finished.
+
+        Returns:
+            bool: True if the job is done, cancelled or failed
+        """
+        return self.finished is not None
+
+
+    def to_dict(self) -> dict:
+        """Returns the state of the job.
+
+        Returns:
+            dict: Job id, status, (partial) information gain grouped by model and error message
+        """
+        return {'job_id': self.id, 'status': self.status, 'information_gain': dict(self.result), 'error': self.error}
+
+
+class InformationGainJobs:
+    """Runs information gain jobs in a background thread pool. A new job of a session cancels the
+    previous job of the same session, so no computation is spent on superseded evidence.
+    """
+    def __init__(self, model_manager, max_workers: int = 2, max_jobs: int = 1024, ttl: float = 300.0):
+        """Initializes the job manager.
+
+        Args:
+            model_manager (ModelManager): Model manager which computes the information gain
+            max_workers (int, optional): Number of jobs which run at the same time. Defaults to 2.
+            max_jobs (int, optional): Maximum number of kept jobs (finished jobs are removed first). Defaults to 1024.
+            ttl (float, optional): Time in seconds after which finished jobs are removed. Defaults to 300.0.
+        """
+        self.model_manager = model_manager
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='information-gain')
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.jobs: OrderedDict[str, InformationGainJob] = OrderedDict()
+        self.session_jobs: dict[str, InformationGainJob] = {}
+        self.lock = threading.Lock()
+
+
+    def submit(self, session_id: str, evidence: dict, target_node: str = 'Diagnose',
+               model_evidence: dict[str, dict] | None = None, model_names: list[str] | None = None,
+               evidence_keys: dict[str, tuple] | None = None) -> InformationGainJob:
+        """Submits a job and cancels the previous job of the session. Models of the previous job which
+        are not done yet are added to the models of the new job, so the session gets their results.
+
+        Args:
+            session_id (str): Session which submits the job
+            evidence (dict): Evidence of the case
+            target_node (str, optional): Target node. Defaults to 'Diagnose'.
+            model_evidence (dict[str, dict] | None, optional): Evidence which replaces the evidence for
+                single models. Defaults to None.
+            model_names (list[str] | None, optional): Models whose information gain is computed.
+                Defaults to None (all models).
+            evidence_keys (dict[str, tuple] | None, optional): Canonical evidence of the information gain
+                grouped by model. Defaults to None.
+
+        Returns:
+            InformationGainJob: Submitted job
+        """
+        with self.lock:
+            previous = self.session_jobs.get(session_id)
+            if previous is not None:
+                previous.cancel()
+                if model_names is not None and previous.status != 'done':
+                    if previous.model_names is None:
+                        model_names = None
+                    else:
+                        model_names = model_names + [name for name in previous.model_names
+                                                     if name not in model_names and name not in previous.result]
+            job = InformationGainJob(session_id, evidence, target_node, model_evidence or {}, model_names, evidence_keys)
+            self.session_jobs[session_id] = job
+            self.jobs[job.id] = job
+            self.remove_old_jobs()
+        job.future = self.executor.submit(self.run, job)
+        return job
+
+
+    def run(self, job: InformationGainJob) -> None:
+        """Computes the information gain of a job model by model and stops if the job is cancelled.
+        The candidates of one model are computed in one batched pass, so a cancellation takes effect
+        after the current model.
+
+        Args:
+            job (InformationGainJob): Job
+        """
+        if job.cancel_event.is_set():
+            job.finish('cancelled')
+            return
+        job.status = 'running'
+        start_time = time.time()
+        try:
+            results = self.model_manager.iter_information_gain(job.evidence, job.target_node, job.model_evidence,
+                                                               job.session_id, job.model_names)
+            for model_name, ig in results:
+                job.result[model_name] = ig
+                if job.cancel_event.is_set():
+                    # closing the iterator cancels the tasks of the remaining models
+                    results.close()
+                    job.finish('cancelled')
+                    return
+        except Exception as error:
+            logger.exception('Information gain job failed', extra={'job_id': job.id})
+            job.finish('failed', str(error))
+            return
+        job.finish('done')
+        logger.debug('Information gain job done', extra={'job_id': job.id, 'models': list(job.result),
+                                                         'seconds': time.time() - start_time})
+
+
+    def is_current(self, job: InformationGainJob) -> bool:
+        """Checks if a job is the latest job of its session (the session ignores the results of older jobs).
+
+        Args:
+            job (InformationGainJob): Job
+
+        Returns:
+            bool: True if no newer job of the session was submitted
+        """
+        with self.lock:
+            return self.session_jobs.get(job.session_id) is job
+
+
+    def get(self, job_id: str) -> InformationGainJob | None:
+        """Returns a job.
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            InformationGainJob | None: Job, None if it is unknown or already removed
+        """
+        with self.lock:
+            return self.jobs.get(job_id)
+
+
+    def remove_old_jobs(self) -> None:
+        """Removes finished jobs after their time to live and the oldest finished jobs if there are
+        too many jobs. Must be called with the lock held.
+        """
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            expired = job.is_finished() and now - job.finished > self.ttl
+            if expired or (len(self.jobs) > self.max_jobs and job.is_finished()):
+                del self.jobs[job_id]
+                if self.session_jobs.get(job.session_id) is job:
+                    del self.session_jobs[job.session_id]
+
+
+    def get_stats(self) -> dict[str, int]:
+        """Returns the number of kept jobs per state.
+
+        Returns:
+            dict[str, int]: Number of jobs grouped by state
+        """
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return {state: sum(job.status == state for job in jobs) for state in JOB_STATES}
@@ -0,0 +1,396 @@
+import itertools
+import numpy as np
+import networkx as nx
+from .model_view import ModelView
+
+
+class JunctionTree:
+    """Compiled junction tree (clique tree) of a discrete bayesian network.
+
+    The tree is compiled once per model. Every evidence set is then handled by a single
+    calibration (Shafer-Shenoy belief propagation), after which the marginals of all nodes
+    can be read off the calibrated cliques.
+    """
+    def __init__(self, view: ModelView):
+        """Compiles the junction tree of a model.
+
+        Args:
+            view (ModelView): View of the fitted bayesian network
+        """
+        self.nodes: list[str] = list(view.nodes)
+        self.node_index = view.node_index
+        self.cardinality = view.cardinality
+
+        self.cliques: list[tuple[str, ...]] = self._triangulate(view)
+        self.neighbours: list[list[int]] = [[] for _ in self.cliques]
+        self._build_tree()
+        self.home_clique = {node: min((index for index, clique in enumerate(self.cliques) if node in clique),
+                                      key=lambda index: self.potential_size(index))
+                            for node in self.nodes}
+        self.potentials: list[np.ndarray] = self._build_potentials(view)
+
+        # Axes summed out of the sending clique and broadcast shape within the receiving clique per directed edge
+        self._sum_axes: dict[tuple[int, int], tuple[int, ...]] = {}
+        self._message_shape: dict[tuple[int, int], tuple[int, ...]] = {}
+        for i, neighbours in enumerate(self.neighbours):
+            for j in neighbours:
+                separator = set(self.cliques[i]) & set(self.cliques[j])
+                self._sum_axes[(i, j)] = tuple(axis for axis, node in enumerate(self.cliques[i]) if node not in separator)
+                self._message_shape[(i, j)] = tuple(self.cardinality[node] if node in separator else 1
+                                                    for node in self.cliques[j])
+        self.root = 0
+        self._distribute_order = {}
+        self._collect_order = self._get_distribute_order(self.root)[::-1]
+
+
+    def potential_size(self, clique_index: int) -> int:
+        """Returns the number of entries of a clique potential.
+
+        Args:
+            clique_index (int): Index of the clique
+
+        Returns:
+            int: Number of entries
+        """
+        return int(np.prod([self.cardinality[node] for node in self.cliques[clique_index]]))
+
+
+    def _triangulate(self, view: ModelView) -> list[tuple[str, ...]]:
+        """Moralizes and triangulates the network with the greedy min-fill heuristic (ties broken
+        by clique weight) and returns the maximal cliques.
+
+        Args:
+            view (ModelView): View of the fitted bayesian network
+
+        Returns:
+            list[tuple[str, ...]]: Maximal cliques, variables ordered by node index
+        """
+        graph = {node: set() for node in self.nodes}
+        for node in self.nodes:
+            family = list(view.parents[node]) + [node]
+            for u, v in itertools.combinations(family, 2):
+                graph[u].add(v)
+                graph[v].add(u)
+
+        def elimination_cost(node: str) -> tuple[int, int]:
+            neighbours = graph[node]
+            fill_in = sum(1 for u, v in itertools.combinations(neighbours, 2) if v not in graph[u])
+            weight = int(np.prod([self.cardinality[n] for n in neighbours | {node}]))
+            return fill_in, weight
+
+        elimination_cliques = []
+        while graph:
+            node = min(graph, key=lambda n: (*elimination_cost(n), self.node_index[n]))
+            neighbours = graph.pop(node)
+            for u, v in itertools.combinations(neighbours, 2):
+                graph[u].add(v)
+                graph[v].add(u)
+            for neighbour in neighbours:
+                graph[neighbour].discard(node)
+            elimination_cliques.append(frozenset(neighbours | {node}))
+
+        maximal_cliques = []
+        for clique in sorted(set(elimination_cliques), key=len, reverse=True):
+            if not any(clique <= other for other in maximal_cliques):
+                maximal_cliques.append(clique)
+        return [tuple(sorted(clique, key=self.node_index.get)) for clique in maximal_cliques]
+
+
+    def _build_tree(self) -> None:
+        """Connects the cliques to a maximum weight spanning tree (weight: separator size).
+        Unconnected parts of the network are joined by empty separators.
+        """
+        clique_graph = nx.Graph()
+        clique_graph.add_nodes_from(range(len(self.cliques)))
+        for i, j in itertools.combinations(range(len(self.cliques)), 2):
+            clique_graph.add_edge(i, j, weight=len(set(self.cliques[i]) & set(self.cliques[j])))
+        for i, j in nx.maximum_spanning_tree(clique_graph).edges():
+            self.neighbours[i].append(j)
+            self.neighbours[j].append(i)
+
+
+    def _build_potentials(self, view: ModelView) -> list[np.ndarray]:
+        """Assigns every CPD to a clique containing its family and multiplies them into the
+        initial clique potentials.
+
+        Args:
+            view (ModelView): View of the fitted bayesian network
+
+        Returns:
+            list[np.ndarray]: Initial clique potentials
+        """
+        potentials = [np.ones([self.cardinality[node] for node in clique]) for clique in self.cliques]
+        for node in self.nodes:
+            variables, values = (node, *view.parents[node]), view.tables[node]
+            clique_index = min((index for index, clique in enumerate(self.cliques) if set(variables) <= set(clique)),
+                               key=lambda index: self.potential_size(index))
+            clique = self.cliques[clique_index]
+            values = np.transpose(values, sorted(range(len(variables)), key=lambda axis: clique.index(variables[axis])))
+            shape = [self.cardinality[n] if n in variables else 1 for n in clique]
+            potentials[clique_index] = potentials[clique_index] * values.reshape(shape)
+        return potentials
+
+
+    def _get_distribute_order(self, root: int) -> list[tuple[int, int]]:
+        """Returns all directed edges pointing away from a root clique in breadth first order.
+
+        Args:
+            root (int): Index of the root clique
+
+        Returns:
+            list[tuple[int, int]]: Directed edges (sender, receiver)
+        """
+        if root not in self._distribute_order:
+            order = []
+            queue = [root]
+            visited = {root}
+            while queue:
+                clique = queue.pop(0)
+                for neighbour in self.neighbours[clique]:
+                    if neighbour in visited:
+                        continue
+                    visited.add(neighbour)
+                    order.append((clique, neighbour))
+                    queue.append(neighbour)
+            self._distribute_order[root] = order
+        return self._distribute_order[root]
+
+
+    def reduce_potential(self, clique_index: int, evidence: dict[str, int]) -> np.ndarray:
+        """Returns the potential of a clique with all evidence of its home nodes entered.
+
+        Args:
+            clique_index (int): Index of the clique
+            evidence (dict[str, int]): Evidence as node -> state index
+
+        Returns:
+            np.ndarray: Reduced potential
+        """
+        potential = self.potentials[clique_index]
+        clique = self.cliques[clique_index]
+        for node, state_index in evidence.items():
+            if self.home_clique[node] != clique_index:
+                continue
+            indicator = np.zeros(self.cardinality[node])
+            indicator[state_index] = 1
+            potential = potential * indicator.reshape([-1 if n == node else 1 for n in clique])
+        return potential
+
+
+    def calibrate(self, evidence: dict[str, int]) -> 'Calibration':
+        """Enters the evidence and calibrates the tree with one collect and one distribute pass.
+
+        Args:
+            evidence (dict[str, int]): Evidence as node -> state index
+
+        Returns:
+            Calibration: Calibrated tree
+        """
+        calibration = Calibration(self, evidence)
+        calibration.propagate(self._collect_order, reverse=True)
+        calibration.propagate(self._get_distribute_order(self.root))
+        return calibration
+
+
+    def update(self, calibration: 'Calibration', evidence: dict[str, int], max_changed_cliques: int = 2) -> 'Calibration':
+        """Calibrates the tree for new evidence, starting from the calibration of similar evidence.
+
+        Evidence only enters the potentials of the home cliques of the observed nodes. A message
+        only changes if a clique with a changed potential lies behind its sender, so all other
+        messages are taken over from the previous calibration. A single changed clique needs
+        half of the messages of a full calibration (only those directed away from it).
+
+        Args:
+            calibration (Calibration): Previous calibration (it is not changed)
+            evidence (dict[str, int]): New evidence as node -> state index
+            max_changed_cliques (int, optional): If more cliques have changed potentials, the tree
+                is calibrated from scratch. Defaults to 2.
+
+        Returns:
+            Calibration: Calibrated tree
+        """
+        changed_nodes = {node for node in set(evidence) | set(calibration.evidence)
+                         if evidence.get(node) != calibration.evidence.get(node)}
+        changed_cliques = {self.home_clique[node] for node in changed_nodes}
+        if len(changed_cliques) > max_changed_cliques:
+            return self.calibrate(evidence)
+
+        updated = Calibration(self, evidence, calibration.potentials)
+        for clique_index in changed_cliques:
+            updated.potentials[clique_index] = self.reduce_potential(clique_index, evidence)
+        updated.messages = dict(calibration.messages)
+        if not changed_cliques:
+            return updated
+
+        # number of changed cliques within the subtree of every clique (rooted at the root clique)
+        distribute_order = self._get_distribute_order(self.root)
+        changed_below = {index: int(index in changed_cliques) for index in range(len(self.cliques))}
+        for parent, child in reversed(distribute_order):
+            changed_below[parent] += changed_below[child]
+        # upward messages carry the changes of the subtree, downward messages the changes outside of it
+        updated.propagate([edge for edge in self._collect_order if changed_below[edge[1]] > 0], reverse=True)
+        updated.propagate([edge for edge in distribute_order if changed_below[edge[1]] < len(changed_cliques)])
+        return updated
+
+
+    def compute_message(self, potentials: list[np.ndarray], messages: dict[tuple[int, int], np.ndarray],
+                        sender: int, receiver: int) -> np.ndarray:
+        """Computes the (normalized) message of one clique to a neighbouring clique.
+
+        Args:
+            potentials (list[np.ndarray]): Clique potentials with entered evidence
+            messages (dict[tuple[int, int], np.ndarray]): Already computed messages
+            sender (int): Index of the sending clique
+            receiver (int): Index of the receiving clique
+
+        Returns:
+            np.ndarray: Message over the separator, shaped for broadcasting in the receiving clique
+        """
+        belief = potentials[sender]
+        for neighbour in self.neighbours[sender]:
+            if neighbour != receiver:
+                belief = belief * messages[(neighbour, sender)]
+        return self._marginalize(belief, sender, receiver)
+
+
+    def compute_messages(self, potentials: list[np.ndarray], messages: dict[tuple[int, int], np.ndarray],
+                         sender: int, receivers: list[int]) -> dict[int, np.ndarray]:
+        """Computes the (normalized) messages of one clique to several neighbouring cliques.
+
+        Every message is the product of the potential with all incoming messages except the one of
+        the receiver. Prefix and suffix products of the incoming messages share this work, so a
+        clique with d receivers needs O(d) instead of O(d^2) multiplications of its potential.
+
+        Args:
+            potentials (list[np.ndarray]): Clique potentials with entered evidence
+            messages (dict[tuple[int, int], np.ndarray]): Already computed messages
+            sender (int): Index of the sending clique
+            receivers (list[int]): Indices of the receiving cliques
+
+        Returns:
+            dict[int, np.ndarray]: Messages grouped by receiving clique
+        """
+        if len(receivers) == 1:
+            return {receivers[0]: self.compute_message(potentials, messages, sender, receivers[0])}
+        prefix = potentials[sender]
+        for neighbour in self.neighbours[sender]:
+            if neighbour not in receivers:
+                prefix = prefix * messages[(neighbour, sender)]
+        incoming = [messages[(receiver, sender)] for receiver in receivers]
+        # suffix[i]: product of the incoming messages of receivers[i:] (only over the separator variables)
+        suffix = [None] * (len(receivers) + 1)
+        for index in range(len(receivers) - 1, 0, -1):
+            suffix[index] = incoming[index] if suffix[index + 1] is None else incoming[index] * suffix[index + 1]
+
+        result = {}
+        for index, receiver in enumerate(receivers):
+            belief = prefix if suffix[index + 1] is None else prefix * suffix[index + 1]
+            result[receiver] = self._marginalize(belief, sender, receiver)
+            prefix = prefix * incoming[index]
+        return result
+
+
+    def _marginalize(self, belief: np.ndarray, sender: int, receiver: int) -> np.ndarray:
+        """Sums a belief of the sending clique out to the separator and normalizes it.
+
+        Args:
+            belief (np.ndarray): Belief of the sending clique without the message of the receiver
+            sender (int): Index of the sending clique
+            receiver (int): Index of the receiving clique
+
+        Returns:
+            np.ndarray: Message over the separator, shaped for broadcasting in the receiving clique
+        """
+        message = belief.sum(axis=self._sum_axes[(sender, receiver)]).reshape(self._message_shape[(sender, receiver)])
+        total = message.sum()
+        if total > 0:
+            message = message / total
+        return message
+
+
+class Calibration:
+    """Calibrated state of a junction tree for one evidence set.
+    """
+    def __init__(self, junction_tree: JunctionTree, evidence: dict[str, int], potentials: list[np.ndarray] | None = None):
+        """Initializes the calibration with the evidence entered into the clique potentials.
+
+        Args:
+            junction_tree (JunctionTree): Compiled junction tree
+            evidence (dict[str, int]): Evidence as node -> state index
+            potentials (list[np.ndarray] | None, optional): Potentials with already entered evidence,
+                which are reused (the list is copied). Defaults to None.
+        """
+        self.junction_tree = junction_tree
+        self.evidence = evidence
+        if potentials is not None:
+            self.potentials = list(potentials)
+        else:
+            self.potentials = [junction_tree.reduce_potential(index, evidence) for index in range(len(junction_tree.cliques))]
+        self.messages: dict[tuple[int, int], np.ndarray] = {}
+        self.beliefs: dict[int, np.ndarray] = {}
+
+
+    def propagate(self, edges: list[tuple[int, int]], reverse: bool = False) -> None:
+        """Sends messages along the given directed edges (in the given order).
+
+        Args:
+            edges (list[tuple[int, int]]): Directed edges (sender, receiver)
+            reverse (bool, optional): If True: messages are sent from receiver to sender. Defaults to False.
+        """
+        if reverse:
+            edges = [(receiver, sender) for sender, receiver in edges]
+        # consecutive edges of the same sender are computed together
+        for sender, group in itertools.groupby(edges, key=lambda edge: edge[0]):
+            receivers = [receiver for _, receiver in group]
+            for receiver, message in self.junction_tree.compute_messages(self.potentials, self.messages,
+                                                                         sender, receivers).items():
+                self.messages[(sender, receiver)] = message
+        self.beliefs = {}
+
+
+    def get_belief(self, clique_index: int) -> np.ndarray:
+        """Returns the (unnormalized) calibrated belief of a clique.
+
+        Args:
+            clique_index (int): Index of the clique
+
+        Returns:
+            np.ndarray: Clique belief
+        """
+        if clique_index not in self.beliefs:
+            belief = self.potentials[clique_index]
+            for neighbour in self.junction_tree.neighbours[clique_index]:
+                belief = belief * self.messages[(neighbour, clique_index)]
+            self.beliefs[clique_index] = belief
+        return self.beliefs[clique_index]
+
+
+    def get_marginal(self, node: str) -> np.ndarray:
+        """Returns the posterior distribution of a single node.
+
+        Args:
+            node (str): Node name
+
+        Returns:
+            np.ndarray: Probabilities ordered like the state names of the node
+        """
+        clique_index = self.junction_tree.home_clique[node]
+        clique = self.junction_tree.cliques[clique_index]
+        axis = clique.index(node)
+        marginal = self.get_belief(clique_index).sum(axis=tuple(a for a in range(len(clique)) if a != axis))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return marginal / marginal.sum()
+
+
+    def get_marginals(self, nodes: list[str] | None = None) -> dict[str, np.ndarray]:
+        """Returns the posterior distributions of multiple nodes.
+
+        Args:
+            nodes (list[str] | None, optional): Nodes to return. Defaults to None (all nodes).
+
+        Returns:
+            dict[str, np.ndarray]: Posterior distributions grouped by node
+        """
+        if nodes is None:
+            nodes = self.junction_tree.nodes
+        return {node: self.get_marginal(node) for node in nodes}
@@ -0,0 +1,51 @@
+import json
+import logging
+import sys
+
+# attributes of every log record, all other attributes are fields passed with 'extra'
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats log records as one JSON object per line: time, level, logger, message and all fields
+    passed with 'extra' (e.g. logger.info('Inference', extra={'seconds': 0.1})).
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        """Formats a log record.
+
+        Args:
+            record (logging.LogRecord): Log record
+
+        Returns:
+            str: JSON line
+        """
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(logger_name: str, level: str = 'INFO') -> None:
+    """Sends the log records of a logger (and its children) as JSON lines to stderr.
+    Does nothing if the logger already has a handler.
+
+    Args:
+        logger_name (str): Logger name, e.g. the name of the package
+        level (str, optional): Minimum level ('DEBUG', 'INFO', 'WARNING', ...). Debug records contain
+            the evidence of every request. Defaults to 'INFO'.
+    """
+    logger = logging.getLogger(logger_name)
+    logger.setLevel(level.upper())
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(StructuredFormatter())
+    logger.addHandler(handler)
+    # the records are not formatted a second time by handlers of the root logger
+    logger.propagate = False
@@ -0,0 +1,222 @@
+from collections.abc import Callable
+from contextlib import contextmanager
+import bisect
+import math
+import threading
+import time
+
+# upper bounds of the histogram buckets in seconds (from sub-millisecond filtering to slow information gains)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Thread-safe histogram of durations with labels, like a Prometheus histogram.
+    """
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """Initializes an empty histogram.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            label_names (tuple[str, ...], optional): Names of the labels. Defaults to ().
+            buckets (tuple[float, ...], optional): Sorted upper bounds of the buckets. Defaults to DEFAULT_BUCKETS.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        # label values -> [counts per bucket (last bucket: +Inf), sum]
+        self.series: dict[tuple[str, ...], list] = {}
+        self.lock = threading.Lock()
+
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Adds an observation.
+
+        Args:
+            value (float): Observed value (seconds)
+            **labels (str): Value of every label
+        """
+        label_values = tuple(str(labels[label_name]) for label_name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Context manager which observes the duration of its block.
+
+        Args:
+            **labels (str): Value of every label
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+
+    def get_stats(self) -> dict[tuple[str, ...], dict[str, int | float]]:
+        """Returns the number and the sum of the observations.
+
+        Returns:
+            dict[tuple[str, ...], dict[str, int | float]]: 'count' and 'sum' grouped by label values
+        """
+        with self.lock:
+            return {label_values: {'count': sum(counts), 'sum': total} for label_values, (counts, total) in self.series.items()}
+
+
+    def render(self) -> list[str]:
+        """Returns the histogram in the Prometheus text format.
+
+        Returns:
+            list[str]: Lines
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = {label_values: (list(counts), total) for label_values, (counts, total) in self.series.items()}
+        for label_values, (counts, total) in sorted(series.items()):
+            labels = [f'{name}="{escape_label_value(value)}"' for name, value in zip(self.label_names, label_values)]
+            cumulative = 0
+            for bound, count in zip([*self.buckets, math.inf], counts):
+                cumulative += count
+                bucket_labels = ','.join([*labels, f'le="{"+Inf" if bound == math.inf else repr(float(bound))}"'])
+                lines.append(f'{self.name}_bucket{{{bucket_labels}}} {cumulative}')
+            label_string = f'{{{",".join(labels)}}}' if labels else ''
+            lines.append(f'{self.name}_sum{label_string} {total!r}')
+            lines.append(f'{self.name}_count{label_string} {cumulative}')
+        return lines
+
+
+class CallbackMetric:
+    """Counter or gauge whose values are read from a callback when the metrics are rendered, e.g. the
+    statistics which the caches already count.
+    """
+    def __init__(self, name: str, documentation: str, metric_type: str, label_names: tuple[str, ...],
+                 collect: Callable[[], dict[tuple, int | float]]):
+        """Initializes the metric.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            metric_type (str): 'counter' or 'gauge'
+            label_names (tuple[str, ...]): Names of the labels
+            collect (Callable[[], dict[tuple, int | float]]): Returns the values grouped by label values
+        """
+        if metric_type not in ('counter', 'gauge'):
+            raise ValueError(f'Unknown metric type "{metric_type}"')
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.label_names = label_names
+        self.collect = collect
+
+
+    def render(self) -> list[str]:
+        """Returns the current values in the Prometheus text format.
+
+        Returns:
+            list[str]: Lines
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        for label_values, value in sorted(self.collect().items()):
+            labels = ','.join(f'{name}="{escape_label_value(str(label_value))}"'
+                              for name, label_value in zip(self.label_names, label_values))
+            lines.append(f'{self.name}{{{labels}}} {float(value)!r}' if labels else f'{self.name} {float(value)!r}')
+        return lines
+
+
+class MetricsRegistry:
+    """All metrics of the process.
+    """
+    def __init__(self):
+        """Initializes an empty registry.
+        """
+        self.histograms: dict[str, Histogram] = {}
+        self.callbacks: dict[str, CallbackMetric] = {}
+        self.lock = threading.Lock()
+
+
+    def histogram(self, name: str, documentation: str, label_names: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Returns a registered histogram or registers a new one.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            label_names (tuple[str, ...], optional): Names of the labels. Defaults to ().
+            buckets (tuple[float, ...], optional): Sorted upper bounds of the buckets. Defaults to DEFAULT_BUCKETS.
+
+        Returns:
+            Histogram: Histogram
+        """
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(name, documentation, label_names, buckets)
+            return self.histograms[name]
+
+
+    def callback(self, name: str, documentation: str, metric_type: str, label_names: tuple[str, ...],
+                 collect: Callable[[], dict[tuple, int | float]]) -> CallbackMetric:
+        """Registers a counter or gauge whose values are read from a callback (replaces a metric with
+        the same name).
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            metric_type (str): 'counter' or 'gauge'
+            label_names (tuple[str, ...]): Names of the labels
+            collect (Callable[[], dict[tuple, int | float]]): Returns the values grouped by label values
+
+        Returns:
+            CallbackMetric: Metric
+        """
+        metric = CallbackMetric(name, documentation, metric_type, label_names, collect)
+        with self.lock:
+            self.callbacks[name] = metric
+        return metric
+
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text format (version 0.0.4).
+
+        Returns:
+            str: Metrics
+        """
+        with self.lock:
+            metrics = [*self.histograms.values(), *self.callbacks.values()]
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+
+def escape_label_value(value: str) -> str:
+    """Escapes a label value for the Prometheus text format.
+
+    Args:
+        value (str): Label value
+
+    Returns:
+        str: Escaped label value
+    """
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+
+# latency of every stage of a request
+EVIDENCE_FILTER_SECONDS = registry.histogram(
+    'cdss_evidence_filter_seconds', 'Time to filter and discretize the evidence of a model', ('model',))
+INFERENCE_SECONDS = registry.histogram(
+    'cdss_inference_seconds', 'Time of one inference task of a model (including the wait for a worker)', ('model', 'method'))
+INFORMATION_GAIN_SECONDS = registry.histogram(
+    'cdss_information_gain_seconds', 'Time of the information gain of all nodes of a model (including the wait for a worker)',
+    ('model', 'method'))
+SERIALIZATION_SECONDS = registry.histogram(
+    'cdss_serialization_seconds', 'Time to serialize (and compress) a response or stream event', ('format',))
+REQUEST_SECONDS = registry.histogram(
+    'cdss_request_seconds', 'Total time of a request (streamed responses until the last event)', ('endpoint', 'method', 'status'))
@@ -0,0 +1,197 @@
+import json
+import os
+import numpy as np
+from pgmpy.factors.discrete import TabularCPD
+from pgmpy.models import DiscreteBayesianNetwork
+
+# version of the model artifact format (JSON header + flat CPD array)
+ARTIFACT_FORMAT = 1
+
+
+def cpd_to_array(model: DiscreteBayesianNetwork, node: str, state_names: dict[str, list[str]]) -> tuple[list[str], np.ndarray]:
+    """Returns the CPD of a node as dense array with one axis per variable (node first, then its parents).
+
+    Args:
+        model (DiscreteBayesianNetwork): Fitted bayesian network
+        node (str): Node name
+        state_names (dict[str, list[str]]): State order of every axis, grouped by node
+
+    Returns:
+        tuple[list[str], np.ndarray]: Variables of the axes and CPD values
+    """
+    cpd = model.get_cpds(node)
+    variables = list(cpd.variables)
+    values = cpd.get_values().reshape([len(state_names[variable]) for variable in variables])
+    # align the state order of every axis with the given state order
+    for axis, variable in enumerate(variables):
+        order = [cpd.state_names[variable].index(state) for state in state_names[variable]]
+        values = np.take(values, order, axis=axis)
+    return variables, values
+
+
+def read_artifact_header(path: str) -> dict:
+    """Reads the JSON header of a model artifact (see ModelView.load).
+
+    Args:
+        path (str): Path of the JSON header
+
+    Raises:
+        ValueError: If the artifact has an unknown format version
+
+    Returns:
+        dict: Header with the format version, nodes, edges, states, parents, intervals and CPD positions
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        header = json.load(file)
+    if header.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f'Unknown model artifact format "{header.get("format")}" in {path}')
+    return header
+
+
+class ModelView:
+    """Compact, read-only view of a bayesian network: node and state indexes and the CPDs as dense arrays.
+
+    All inference engines are built from the same view. Evidence is encoded into state indices once
+    (node -> state index), the engines work on these codes and state names are only needed again
+    for the results.
+    """
+    __slots__ = ('nodes', 'node_set', 'node_index', 'edges', 'state_names', 'state_index', 'cardinality',
+                 'parents', 'children', 'tables', 'intervals')
+
+    def __init__(self, nodes: list[str], edges: list[tuple[str, str]], state_names: dict[str, list[str]],
+                 parents: dict[str, list[str]], tables: dict[str, np.ndarray],
+                 intervals: dict[str, list[tuple[float, float, str]]] | None = None):
+        """Builds the view of a model.
+
+        Args:
+            nodes (list[str]): Nodes
+            edges (list[tuple[str, str]]): Edges as (parent, child)
+            state_names (dict[str, list[str]]): State names grouped by node
+            parents (dict[str, list[str]]): Parents (in CPD axis order) grouped by node
+            tables (dict[str, np.ndarray]): CPD of every node as array with the axes (node, *parents)
+            intervals (dict[str, list[tuple[float, float, str]]] | None, optional): Interval states as
+                (left, right, closed) grouped by node, if known. Defaults to None.
+        """
+        self.nodes: tuple[str, ...] = tuple(nodes)
+        self.node_set: frozenset[str] = frozenset(self.nodes)
+        self.node_index: dict[str, int] = {node: index for index, node in enumerate(self.nodes)}
+        self.edges: tuple[tuple[str, str], ...] = tuple((parent, child) for parent, child in edges)
+        self.state_names: dict[str, list[str]] = {node: list(state_names[node]) for node in self.nodes}
+        self.state_index: dict[str, dict[str, int]] = {node: {state: index for index, state in enumerate(states)}
+                                                       for node, states in self.state_names.items()}
+        self.cardinality: dict[str, int] = {node: len(states) for node, states in self.state_names.items()}
+        self.parents: dict[str, tuple[str, ...]] = {node: tuple(parents[node]) for node in self.nodes}
+        self.children: dict[str, tuple[str, ...]] = {node: tuple(child for parent, child in self.edges if parent == node)
+                                                     for node in self.nodes}
+        self.tables: dict[str, np.ndarray] = {}
+        for node in self.nodes:
+            self.tables[node] = tables[node].view()
+            self.tables[node].flags.writeable = False
+        self.intervals: dict[str, list[tuple[float, float, str]]] = {node: [tuple(interval) for interval in node_intervals]
+                                                                    for node, node_intervals in (intervals or {}).items()}
+
+
+    @classmethod
+    def from_model(cls, model: DiscreteBayesianNetwork) -> 'ModelView':
+        """Builds the view of a pgmpy model.
+
+        Args:
+            model (DiscreteBayesianNetwork): Fitted bayesian network
+
+        Returns:
+            ModelView: View of the model
+        """
+        nodes = list(model.nodes())
+        state_names = {node: list(model.get_cpds(node).state_names[node]) for node in nodes}
+        parents = {}
+        tables = {}
+        for node in nodes:
+            variables, tables[node] = cpd_to_array(model, node, state_names)
+            parents[node] = variables[1:]
+        return cls(nodes, list(model.edges()), state_names, parents, tables)
+
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str | None = None) -> 'ModelView':
+        """Loads a model artifact: a JSON header (nodes, edges, state names, parents, intervals and the
+        position of every CPD) and a flat float64 '.npy' array with all CPDs. Nothing gets unpickled.
+
+        Args:
+            path (str): Path of the JSON header (the array is expected next to it with the suffix '.npy')
+            mmap_mode (str | None, optional): Memory map mode of the CPD array (see numpy.load). Defaults to None.
+
+        Raises:
+            ValueError: If the artifact has an unknown format version
+
+        Returns:
+            ModelView: View of the model
+        """
+        header = read_artifact_header(path)
+        values = np.load(f'{os.path.splitext(path)[0]}.npy', mmap_mode=mmap_mode, allow_pickle=False)
+        tables = {}
+        for node, (offset, shape) in header['cpds'].items():
+            tables[node] = values[offset:offset + int(np.prod(shape))].reshape(shape)
+        return cls(header['nodes'], header['edges'], header['states'], header['parents'], tables, header.get('intervals'))
+
+
+    def to_bayesian_network(self) -> DiscreteBayesianNetwork:
+        """Builds a pgmpy model from the view (for pgmpy's inference algorithms).
+
+        Returns:
+            DiscreteBayesianNetwork: Bayesian network with the CPDs of the view
+        """
+        model = DiscreteBayesianNetwork(self.edges)
+        model.add_nodes_from(self.nodes)
+        for node in self.nodes:
+            parents = list(self.parents[node])
+            values = np.array(self.tables[node]).reshape(self.cardinality[node], -1)
+            cpd = TabularCPD(node, self.cardinality[node], values,
+                             evidence=parents or None, evidence_card=[self.cardinality[parent] for parent in parents] or None,
+                             state_names={variable: self.state_names[variable] for variable in [node, *parents]})
+            model.add_cpds(cpd)
+        return model
+
+
+    def encode_evidence(self, evidence: dict[str, str]) -> dict[str, int]:
+        """Converts evidence given by state names to state indices.
+
+        Args:
+            evidence (dict[str, str]): Evidence as node -> state name
+
+        Raises:
+            ValueError: If a state is not a state of its node
+
+        Returns:
+            dict[str, int]: Evidence as node -> state index
+        """
+        codes = {}
+        for node, state in evidence.items():
+            code = self.state_index[node].get(state)
+            if code is None:
+                raise ValueError(f'State "{state}" is not a state of node "{node}"')
+            codes[node] = code
+        return codes
+
+
+    def decode_evidence(self, codes: dict[str, int]) -> dict[str, str]:
+        """Converts evidence given by state indices to state names.
+
+        Args:
+            codes (dict[str, int]): Evidence as node -> state index
+
+        Returns:
+            dict[str, str]: Evidence as node -> state name
+        """
+        return {node: self.state_names[node][code] for node, code in codes.items()}
+
+
+    def evidence_key(self, codes: dict[str, int]) -> tuple[tuple[int, int], ...]:
+        """Returns a canonical, hashable representation of encoded evidence.
+
+        Args:
+            codes (dict[str, int]): Evidence as node -> state index
+
+        Returns:
+            tuple[tuple[int, int], ...]: (node index, state index) pairs sorted by node index
+        """
+        return tuple(sorted((self.node_index[node], code) for node, code in codes.items()))
@@ -1,27 +1,152 @@
 import joblib
-from pgmpy.inference import VariableElimination, ApproxInference
 import os
+import hashlib
 from pgmpy.models import DiscreteBayesianNetwork
+from pgmpy.factors.discrete import DiscreteFactor
 import pandas as pd
 import json
 import numpy as np
 from scipy.stats import entropy
 import math
 import time
+import threading
+import logging
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from .junction_tree import JunctionTree, Calibration
+from .einsum_engine import EinsumEngine
+from .query_planning import PlannedVariableElimination
+from .caching import PosteriorCache, SingleFlight
+from .model_view import ModelView, read_artifact_header
+from .relevance import RelevanceReducer
+from .sampling import LikelihoodWeighting
+from .intervals import IntervalIndex
+from .workers import WorkerPool, get_memory_usage
+from .encoding import to_permille
+from .metrics import MetricsRegistry, EVIDENCE_FILTER_SECONDS, INFERENCE_SECONDS, INFORMATION_GAIN_SECONDS
+
+INFERENCE_MODES = ['variable_elimination', 'junction_tree', 'einsum', 'likelihood_weighting']
+EXECUTION_MODES = ['sequential', 'worker_pool']
+logger = logging.getLogger(__name__)
+# position of the session key in the arguments of model tasks, it is not part of the coalescing key
+SESSION_KEY_ARGUMENTS = {'get_inference': 2, 'get_information_gain_of_all_nodes': 2}
+# caches of get_cache_stats which are exported as metrics and the statistic of their number of entries
+CACHE_SIZE_STATS = {'posteriors': 'entries', 'query_plans': 'plans', 'relevance': 'networks'}
 
 
 class ModelManager:
     """Class for managing all bayesian network models
     """
-    def __init__(self, models: dict[str, str]):
+    def __init__(self, models: dict[str, str], inference_mode: str | dict[str, str] = 'variable_elimination',
+                 execution_mode: str = 'sequential', workers_per_model: int = 1, deadline: float = 60.0,
+                 latency_budget: float | None = None, max_loaded_models: int | None = None,
+                 preload: list[str] | None = None):
         """Initializes class
+
+        Args:
+            models (dict[str, str]): Model names and their file names (without '.json'/'.pkl')
+            inference_mode (str | dict[str, str], optional): Inference engine of all models or
+                engines grouped by model name (missing models use 'variable_elimination').
+                Defaults to 'variable_elimination'.
+            execution_mode (str, optional): One of EXECUTION_MODES. 'worker_pool' runs the (case, model)
+                tasks concurrently in long-lived worker processes per model. Defaults to 'sequential'.
+            workers_per_model (int, optional): Worker processes per model in 'worker_pool' mode. Defaults to 1.
+            deadline (float, optional): Maximum time in seconds to gather the results of one request
+                in 'worker_pool' mode. Defaults to 60.0.
+            latency_budget (float | None, optional): If given, exact results which are not done within
+                this time (in seconds) are replaced by likelihood weighting estimates, which are
+                sampled for the same time. Defaults to None.
+            max_loaded_models (int | None, optional): Maximum number of models which are loaded at the same
+                time, the least recently used model is unloaded. Models are loaded on first use.
+                Ignored in 'worker_pool' mode, which loads all models before the workers are forked.
+                Defaults to None (no limit).
+            preload (list[str] | None, optional): Models which are loaded in a background thread right away.
+                Defaults to None.
         """
+        if execution_mode not in EXECUTION_MODES:
+            raise ValueError(f'Unknown execution mode "{execution_mode}". Possible modes: {EXECUTION_MODES}')
         BASE_DIR = os.path.dirname(__file__)
-        self.models: list[Model] = []
+        # only the metadata (nodes, edges and state names) is read now, the models are loaded on first use
+        self.models: list[ModelMetadata] = []
         for (key, filename) in models.items():
-            self.models.append(Model(key, f'{BASE_DIR}/models/{filename}.pkl'))
+            if isinstance(inference_mode, dict):
+                model_inference_mode = inference_mode.get(key, 'variable_elimination')
+            else:
+                model_inference_mode = inference_mode
+            # the model artifact loads faster than the pickled pgmpy model
+            path = f'{BASE_DIR}/models/{filename}.json'
+            if not os.path.exists(path):
+                path = f'{BASE_DIR}/models/{filename}.pkl'
+            self.models.append(ModelMetadata(key, path, model_inference_mode))
+        self.model_pool = ModelPool(self.models, max_loaded_models if execution_mode == 'sequential' else None)
+        if preload:
+            self.model_pool.preload(preload)
         self.all_features = []
         self.load_all_features()
+        self.execution_mode = execution_mode
+        self.workers_per_model = workers_per_model
+        self.deadline = deadline
+        self.worker_pool: WorkerPool | None = None
+        self.latency_budget = latency_budget
+        self.executor: ThreadPoolExecutor | None = None
+        if latency_budget is not None and execution_mode == 'sequential':
+            self.executor = ThreadPoolExecutor(len(self.models))
+            # threads of the executor do not survive a fork (e.g. of a prefork web server)
+            os.register_at_fork(after_in_child=self.reset_executor)
+        self.fallbacks = 0
+        # identical concurrent tasks (e.g. several users opening the same example) are computed once
+        self.single_flight = SingleFlight()
+        self.ready = False
+        self.warmup_lock = threading.Lock()
+        self.warmup_stats: dict[str, float] = {}
+
+
+    def warmup(self, target_node: str = 'Diagnose') -> None:
+        """Loads all models and runs the inference and the information gain once per model, so the
+        inference engines (and the caches for empty evidence) are ready before the first request.
+        Does nothing if the models are already warmed up.
+
+        Args:
+            target_node (str, optional): Target node of the information gain. Defaults to 'Diagnose'.
+        """
+        with self.warmup_lock:
+            if self.ready:
+                return
+            start_time = time.time()
+            self.start_workers()
+            for model in self.models:
+                self.get_model(model.get_name())
+            self.model_pool.wait_for_preload()
+            self.warmup_stats['load'] = time.time() - start_time
+            self.get_inference_report({'warmup': {}})
+            self.warmup_stats['inference'] = time.time() - start_time - self.warmup_stats['load']
+            self.get_information_gain({}, target_node)
+            self.warmup_stats['total'] = time.time() - start_time
+            self.ready = True
+            logger.info('Warmup', extra={'seconds': self.warmup_stats})
+
+
+    def reset_executor(self) -> None:
+        """Replaces the thread pool of the latency budget with a new one (in forked processes).
+        """
+        self.executor = ThreadPoolExecutor(len(self.models))
+
+
+    def start_workers(self) -> None:
+        """Starts the worker pool in 'worker_pool' mode. Must not be called while the app package is
+        still imported, because forked workers would wait forever for the import lock of the package.
+        """
+        if self.execution_mode == 'worker_pool' and self.worker_pool is None:
+            # the workers inherit the loaded models, no thread may load a model while they are forked
+            models = [self.get_model(model.get_name()) for model in self.models]
+            self.model_pool.wait_for_preload()
+            self.worker_pool = WorkerPool(models, self.workers_per_model)
+            for model_name, workers in self.get_memory_stats().items():
+                for worker in workers['workers']:
+                    logger.info('Worker started', extra={'model': model_name, 'pid': worker['pid'],
+                                                         'resident_mib': round(worker.get('rss', 0) / 1024**2, 1),
+                                                         'private_mib': round(worker.get('private', 0) / 1024**2, 1)})
 
 
     def load_all_features(self) -> None:
@@ -43,15 +168,309 @@ class ModelManager:
         return self.all_features
     
 
-    def get_inference(self, evidence: dict[str, dict]) -> dict[str, dict]:
+    def get_model_metadata(self, model_name: str) -> 'ModelMetadata':
+        """Returns the metadata of a registered model without loading the model.
+
+        Args:
+            model_name (str): Model name
+
+        Raises:
+            KeyError: If the model is not registered
+
+        Returns:
+            ModelMetadata: Model metadata
+        """
+        for model in self.models:
+            if model.get_name() == model_name:
+                return model
+        raise KeyError(f'Unknown model "{model_name}"')
+
+
+    def get_model(self, model_name: str) -> 'Model':
+        """Returns a registered model, which is loaded if it is not loaded yet.
+
+        Args:
+            model_name (str): Model name
+
+        Returns:
+            Model: Model
+        """
+        return self.model_pool.get(model_name)
+
+
+    def run_tasks(self, tasks: dict, fallback_tasks: dict | None = None) -> dict:
+        """Runs model tasks, concurrently in the worker pool if it is enabled.
+
+        Args:
+            tasks (dict): Tasks as key -> (model name, method name of Model, arguments)
+            fallback_tasks (dict | None, optional): Tasks (same structure and keys), which replace the tasks
+                that exceed the latency budget. Defaults to None.
+
+        Returns:
+            dict: Results grouped by task key
+        """
+        return dict(self.iter_tasks(tasks, fallback_tasks))
+
+
+    def iter_tasks(self, tasks: dict, fallback_tasks: dict | None = None) -> Iterator[tuple]:
+        """Runs model tasks like run_tasks, but yields every result as soon as it is done.
+
+        Args:
+            tasks (dict): Tasks as key -> (model name, method name of Model, arguments)
+            fallback_tasks (dict | None, optional): Tasks (same structure and keys), which replace the tasks
+                that exceed the latency budget. Defaults to None.
+
+        Raises:
+            TimeoutError: If not all tasks of the worker pool were done before the deadline (without latency budget)
+
+        Yields:
+            tuple: Task key and result
+        """
+        if self.execution_mode == 'worker_pool':
+            self.start_workers()
+        use_fallbacks = self.latency_budget is not None and bool(fallback_tasks)
+        if self.worker_pool is None and not use_fallbacks:
+            # tasks of the same model run one after another, so a model is loaded at most once per call
+            for key, (model_name, method, args) in sorted(tasks.items(), key=lambda task: task[1][0]):
+                yield key, self.run_task(model_name, method, args)
+            return
+
+        task_keys = {key: self.get_task_key(model_name, method, args) for key, (model_name, method, args) in tasks.items()}
+        futures = {key: self.submit_task(task_keys[key], *task) for key, task in tasks.items()}
+        # identical tasks of one request share their future, too
+        keys: dict[Future, list] = {}
+        for key, future in futures.items():
+            keys.setdefault(future, []).append(key)
+        timeout = self.latency_budget if use_fallbacks else self.deadline
+        done = set()
+        try:
+            try:
+                for future in as_completed(keys, timeout=timeout):
+                    for key in keys[future]:
+                        done.add(key)
+                        yield key, future.result()
+            except TimeoutError:
+                if not use_fallbacks:
+                    raise TimeoutError(f'{len(futures) - len(done)} of {len(futures)} inference tasks exceeded '
+                                       f'the deadline of {self.deadline}s')
+            for key, future in list(futures.items()):
+                if key in done:
+                    continue
+                if future.done():
+                    done.add(key)
+                    yield key, future.result()
+                    continue
+                # running exact tasks are not stopped, their posteriors still end up in the cache
+                self.single_flight.release(task_keys[key], futures.pop(key))
+                model_name, method, args = fallback_tasks[key]
+                self.fallbacks += 1
+                yield key, self.run_task(model_name, method, args)
+        finally:
+            # tasks which are not needed anymore (iteration stopped) are not started, unless other
+            # requests wait for them
+            for key, future in futures.items():
+                self.single_flight.release(task_keys[key], future)
+
+
+    def get_task_key(self, model_name: str, method: str, args: tuple) -> tuple:
+        """Returns the coalescing key of a model task: model, query kind (method and options) and the
+        canonical filtered evidence. Session keys only select the base of incremental updates, which
+        does not change the result, so tasks of different sessions share their computation.
+
+        Args:
+            model_name (str): Model name
+            method (str): Method name of Model
+            args (tuple): Arguments (evidence first)
+
+        Returns:
+            tuple: Hashable key of the task
+        """
+        evidence, *options = args
+        if method in SESSION_KEY_ARGUMENTS:
+            options[SESSION_KEY_ARGUMENTS[method] - 1] = None
+        return (model_name, method, *options, self.get_evidence_key(model_name, evidence))
+
+
+    def get_evidence_key(self, model_name: str, evidence: dict) -> tuple:
+        """Returns the canonical evidence of a model: only its nodes, numeric values replaced by their
+        interval, sorted by node. Evidence with the same key has the same results.
+
+        Args:
+            model_name (str): Model name
+            evidence (dict): Evidence as node -> state name or numeric value
+
+        Returns:
+            tuple: (node, state name) pairs sorted by node
+        """
+        return tuple(sorted(self.get_model_metadata(model_name).filter_evidence(evidence).items()))
+
+
+    def run_task(self, model_name: str, method: str, args: tuple):
+        """Runs a model task in the calling thread or waits for the identical task in flight.
+
+        Args:
+            model_name (str): Model name
+            method (str): Method name of Model
+            args (tuple): Arguments
+
+        Returns:
+            Any: Result of the task (shared with coalesced tasks)
+        """
+        key = self.get_task_key(model_name, method, args)
+        return self.single_flight.run(key, self.timed_task, model_name, method, args)
+
+
+    def timed_task(self, model_name: str, method: str, args: tuple):
+        """Runs a model task in the calling thread and records its duration (see observe_task).
+
+        Args:
+            model_name (str): Model name
+            method (str): Method name of Model
+            args (tuple): Arguments
+
+        Returns:
+            Any: Result of the task
+        """
+        start_time = time.perf_counter()
+        try:
+            return getattr(self.get_model(model_name), method)(*args)
+        finally:
+            observe_task(model_name, method, time.perf_counter() - start_time)
+
+
+    def submit_task(self, task_key: tuple, model_name: str, method: str, args: tuple) -> Future:
+        """Submits a model task to the worker pool (or the thread pool of the latency budget) or joins
+        the identical task in flight. The future has to be released with SingleFlight.release.
+
+        Args:
+            task_key (tuple): Coalescing key of the task (see get_task_key)
+            model_name (str): Model name
+            method (str): Method name of Model
+            args (tuple): Arguments
+
+        Returns:
+            Future: Future of the result
+        """
+        def submit() -> Future:
+            start_time = time.perf_counter()
+            if self.worker_pool is not None:
+                future = self.worker_pool.submit(model_name, method, *args)
+            else:
+                future = self.executor.submit(getattr(self.get_model(model_name), method), *args)
+            future.add_done_callback(lambda done: observe_task(model_name, method, time.perf_counter() - start_time)
+                                     if not done.cancelled() else None)
+            return future
+
+        return self.single_flight.submit(task_key, submit)
+
+
+    def get_inference(self, evidence: dict[str, dict], model_evidence: dict[str, dict] | None = None,
+                      session_id: str | None = None) -> dict[str, dict]:
+        """Returns the inference results of all cases and models.
+
+        Args:
+            evidence (dict[str, dict]): Evidence grouped by case
+            model_evidence (dict[str, dict] | None, optional): Evidence (grouped by case) which replaces
+                the evidence for single models. Defaults to None.
+            session_id (str | None, optional): Session of the request. If given, every case is updated
+                incrementally from the previous query of the same session and case. Defaults to None.
+
+        Returns:
+            dict[str, dict]: Inference results grouped by case and model
+        """
+        return self.get_inference_report(evidence, model_evidence, session_id)['results']
+
+
+    def get_inference_report(self, evidence: dict[str, dict], model_evidence: dict[str, dict] | None = None,
+                             session_id: str | None = None, compact: bool = False,
+                             selection: set[tuple[str, str]] | None = None) -> dict[str, dict]:
+        """Returns the inference results of all cases and models together with the confidence intervals
+        of all approximate (sampled) results.
+
+        Args:
+            evidence (dict[str, dict]): Evidence grouped by case
+            model_evidence (dict[str, dict] | None, optional): Evidence (grouped by case) which replaces
+                the evidence for single models. Defaults to None.
+            session_id (str | None, optional): Session of the request. If given, every case is updated
+                incrementally from the previous query of the same session and case. Defaults to None.
+            compact (bool, optional): If True, the results use the compact format (see Model.get_inference).
+                Defaults to False.
+            selection (set[tuple[str, str]] | None, optional): If given, only these (case, model) pairs
+                are computed and returned. Defaults to None (all pairs).
+
+        Returns:
+            dict[str, dict]: 'results' grouped by case and model and 'approximation' (confidence
+                intervals, number of samples and effective sample size) grouped by case and model
+        """
+        task_results = {(case, model_name): (result, intervals) for case, model_name, result, intervals
+                        in self.iter_inference(evidence, model_evidence, session_id, compact, selection)}
+
         results = {}
+        approximation = {}
         for case in evidence.keys():
             results[case] = {}
             for model in self.models:
-                results[case][model.get_name()] = model.get_inference(evidence[case])
-        return results
+                if (case, model.get_name()) not in task_results:
+                    continue
+                result, intervals = task_results[(case, model.get_name())]
+                if intervals is not None:
+                    approximation.setdefault(case, {})[model.get_name()] = intervals
+                results[case][model.get_name()] = result
+        return {'results': results, 'approximation': approximation}
+
+
+    def iter_inference(self, evidence: dict[str, dict], model_evidence: dict[str, dict] | None = None,
+                       session_id: str | None = None, compact: bool = False,
+                       selection: set[tuple[str, str]] | None = None) -> Iterator[tuple[str, str, dict, dict | None]]:
+        """Runs the inference of all cases and models and yields every result as soon as it is done
+        (arguments like get_inference_report).
+
+        Args:
+            evidence (dict[str, dict]): Evidence grouped by case
+            model_evidence (dict[str, dict] | None, optional): Evidence (grouped by case) which replaces
+                the evidence for single models. Defaults to None.
+            session_id (str | None, optional): Session of the request. Defaults to None.
+            compact (bool, optional): If True, the results use the compact format. Defaults to False.
+            selection (set[tuple[str, str]] | None, optional): If given, only these (case, model) pairs
+                are computed. Defaults to None (all pairs).
+
+        Yields:
+            tuple[str, str, dict, dict | None]: Case, model name, inference result and the confidence
+                intervals (None for exact results)
+        """
+        model_evidence = model_evidence or {}
+        tasks = {}
+        fallback_tasks = {}
+        for case in evidence.keys():
+            for model in self.models:
+                key = (case, model.get_name())
+                if selection is not None and key not in selection:
+                    continue
+                case_evidence = model_evidence.get(model.get_name(), evidence)[case]
+                if model.inference_mode == 'likelihood_weighting':
+                    tasks[key] = (model.get_name(), 'get_approximate_inference', (case_evidence.copy(), None, compact))
+                    continue
+                session_key = (session_id, case) if session_id is not None else None
+                tasks[key] = (model.get_name(), 'get_inference', (case_evidence.copy(), None, session_key, compact))
+                fallback_tasks[key] = (model.get_name(), 'get_approximate_inference',
+                                       (case_evidence.copy(), self.latency_budget, compact))
+        for (case, model_name), result in self.iter_tasks(tasks, fallback_tasks):
+            # approximate results come with their confidence intervals
+            if isinstance(result, tuple):
+                yield case, model_name, result[0], result[1]
+            else:
+                yield case, model_name, result, None
     
     
+    def get_state_names(self) -> dict[str, dict[str, list[str]]]:
+        """Returns the state names of all registered models (state order of the compact result format).
+
+        Returns:
+            dict[str, dict[str, list[str]]]: State names grouped by model and node
+        """
+        return {model.get_name(): model.state_names for model in self.models}
+
+
     def get_network_structures(self) -> dict[str, dict]:
         """Returns the structure of all register bayesian networks.
 
@@ -64,31 +483,386 @@ class ModelManager:
         return structures
     
     
-    def get_information_gain(self, evidence: dict, target_node: str = 'Diagnose'):
-        ig = {}
+    def get_cache_stats(self) -> dict[str, dict]:
+        """Returns the posterior cache, query plan cache and sub-network cache statistics of all loaded models.
+
+        In 'worker_pool' mode the worker processes compute all results with their own copies of the
+        models. A task can not be sent to one specific worker, so their caches are not reachable and
+        the idle copies in this process would only report zeros. The statistics are empty then.
+
+        Returns:
+            dict[str, dict]: Cache statistics grouped by model (empty in 'worker_pool' mode)
+        """
+        if self.worker_pool is not None:
+            return {}
+        return {model.get_name(): {'posteriors': model.posterior_cache.get_stats(),
+                                   'query_plans': model.get_query_plan_stats(),
+                                   'relevance': model.relevance.get_stats(),
+                                   'information_gain': model.get_information_gain_stats(),
+                                   'calibrations': model.get_calibration_stats(),
+                                   'latency_fallbacks': self.fallbacks,
+                                   'coalescing': self.single_flight.get_stats()}
+                for model in self.model_pool.get_loaded()}
+
+
+    def get_memory_stats(self) -> dict[str, dict]:
+        """Returns the size of the CPD arrays and the memory usage of the processes of all loaded
+        models. In 'sequential' mode all models share the current process.
+
+        Returns:
+            dict[str, dict]: CPD statistics (see Model.get_memory_stats) and 'workers' (process id and
+                memory usage of every worker process, see get_memory_usage) grouped by model
+        """
+        if self.worker_pool is not None:
+            workers = self.worker_pool.get_memory_stats()
+        else:
+            workers = {model.get_name(): [{'pid': os.getpid(), **get_memory_usage()}] for model in self.models}
+        return {model.get_name(): {**model.get_memory_stats(), 'workers': workers[model.get_name()]}
+                for model in self.model_pool.get_loaded()}
+
+
+    def register_metrics(self, registry: MetricsRegistry) -> None:
+        """Exports the cache and information gain statistics (see get_cache_stats) and the memory usage (see get_memory_stats)
+        as metrics, which are read when the metrics are rendered. Counters of a model restart when the
+        model is loaded again. The cache and information gain metrics are omitted in 'worker_pool' mode.
+
+        Args:
+            registry (MetricsRegistry): Registry of the metrics endpoint
+        """
+        def collect_caches(stat: str) -> Callable[[], dict[tuple, int]]:
+            return lambda: {(model_name, cache): stats[cache][CACHE_SIZE_STATS[cache] if stat == 'size' else stat]
+                            for model_name, stats in self.get_cache_stats().items()
+                            for cache in CACHE_SIZE_STATS if stats[cache]}
+        registry.callback('cdss_cache_hits_total', 'Cache hits of the loaded models', 'counter',
+                          ('model', 'cache'), collect_caches('hits'))
+        registry.callback('cdss_cache_misses_total', 'Cache misses of the loaded models', 'counter',
+                          ('model', 'cache'), collect_caches('misses'))
+        registry.callback('cdss_cache_entries', 'Entries of the caches of the loaded models', 'gauge',
+                          ('model', 'cache'), collect_caches('size'))
+        # the junction tree has no query plans, it reuses the calibrations of a session instead
+        registry.callback('cdss_calibrations_total', 'Junction tree calibrations computed from scratch (full) and incrementally',
+                          'counter', ('model', 'kind'),
+                          lambda: {(model_name, kind): stats['calibrations'][kind]
+                                   for model_name, stats in self.get_cache_stats().items() for kind in ('full', 'incremental')})
+        registry.callback('cdss_coalesced_tasks_total', 'Computed tasks and identical concurrent tasks which shared their result',
+                          'counter', ('result',),
+                          lambda: {(result,): count for result, count in self.single_flight.get_stats().items() if result != 'in_flight'})
+        registry.callback('cdss_latency_fallbacks_total', 'Exact results replaced by estimates after the latency budget',
+                          'counter', (), lambda: {(): self.fallbacks})
+        registry.callback('cdss_information_gain_requests_total', 'Information gain computations of the loaded models',
+                          'counter', ('model',),
+                          lambda: {(model_name,): stats['information_gain']['requests'] for model_name, stats in self.get_cache_stats().items()})
+        # skipped candidates are d-separated from the target, their information gain is 0 without inference
+        registry.callback('cdss_information_gain_candidates_total', 'Unobserved information gain candidates, computed or skipped',
+                          'counter', ('model', 'result'),
+                          lambda: {(model_name, result): count
+                                   for model_name, stats in self.get_cache_stats().items()
+                                   for result, count in get_candidate_counts(stats['information_gain']).items()})
+        # every prefork web worker answers with its own process, the 'pid' label tells the workers apart
+        registry.callback('cdss_worker_memory_bytes', 'Memory usage (rss, pss, shared, private) of the processes of the loaded models',
+                          'gauge', ('model', 'pid', 'kind'),
+                          lambda: {(model_name, worker['pid'], kind): value
+                                   for model_name, stats in self.get_memory_stats().items()
+                                   for worker in stats['workers'] for kind, value in worker.items() if kind != 'pid'})
+        registry.callback('cdss_model_cpd_bytes', 'Size of the CPD arrays of the loaded models', 'gauge', ('model',),
+                          lambda: {(model_name,): stats['cpd_bytes'] for model_name, stats in self.get_memory_stats().items()})
+
+
+    def get_information_gain(self, evidence: dict, target_node: str = 'Diagnose', model_evidence: dict[str, dict] | None = None,
+                             session_id: str | None = None, model_names: list[str] | None = None):
+        return dict(self.iter_information_gain(evidence, target_node, model_evidence, session_id, model_names))
+
+
+    def iter_information_gain(self, evidence: dict, target_node: str = 'Diagnose', model_evidence: dict[str, dict] | None = None,
+                              session_id: str | None = None, model_names: list[str] | None = None) -> Iterator[tuple[str, dict[str, float]]]:
+        """Computes the information gain of all models and yields every result as soon as it is done.
+
+        Args:
+            evidence (dict): Evidence of the case
+            target_node (str, optional): Target node. Defaults to 'Diagnose'.
+            model_evidence (dict[str, dict] | None, optional): Evidence which replaces the evidence for
+                single models. Defaults to None.
+            session_id (str | None, optional): Session of the request. Defaults to None.
+            model_names (list[str] | None, optional): If given, only the information gain of these models
+                is computed. Defaults to None (all models).
+
+        Yields:
+            tuple[str, dict[str, float]]: Model name and information gain grouped by node
+        """
+        model_evidence = model_evidence or {}
+        session_key = (session_id, 'information_gain') if session_id is not None else None
+        tasks = {}
+        fallback_tasks = {}
         for model in self.models:
-            start_time = time.time()
-            ig[model.get_name()] = model.get_information_gain_of_all_nodes(evidence.copy(), target_node)
-            print(f'{model.get_name()}: {time.time() - start_time}')
-        return ig
+            if model_names is not None and model.get_name() not in model_names:
+                continue
+            case_evidence = model_evidence.get(model.get_name(), evidence)
+            tasks[model.get_name()] = (model.get_name(), 'get_information_gain_of_all_nodes',
+                                       (case_evidence.copy(), target_node, session_key))
+            if model.inference_mode != 'likelihood_weighting':
+                fallback_tasks[model.get_name()] = (model.get_name(), 'get_approximate_information_gain',
+                                                    (case_evidence.copy(), target_node, self.latency_budget))
+        yield from self.iter_tasks(tasks, fallback_tasks)
+
+
+class ModelMetadata:
+    """Lightweight description of a registered model (nodes, edges and state names), which is available
+    without loading the CPDs or building the inference engine.
+    """
+    def __init__(self, name: str, path: str, inference_mode: str = 'variable_elimination'):
+        """Reads the metadata of a model.
+
+        Args:
+            name (str): Name of model
+            path (str): Path to stored model (see Model). Only the JSON header of model artifacts is read,
+                pickled models have to be loaded completely.
+            inference_mode (str, optional): Inference engine of the model, one of INFERENCE_MODES.
+                Defaults to 'variable_elimination'.
+        """
+        self.name = name
+        self.path = path
+        self.inference_mode = inference_mode
+        self.files = [path, f'{os.path.splitext(path)[0]}.npy'] if path.endswith('.json') else [path]
+        # the version changes with every rebuilt model
+        digest = hashlib.sha256()
+        for file_path in self.files:
+            with open(file_path, 'rb') as file:
+                digest.update(file.read())
+        self.version = digest.hexdigest()[:16]
+        self.modified = max(os.path.getmtime(file_path) for file_path in self.files)
+        if path.endswith('.json'):
+            header = read_artifact_header(path)
+            self.nodes: tuple[str, ...] = tuple(header['nodes'])
+            self.edges: tuple[tuple[str, str], ...] = tuple((parent, child) for parent, child in header['edges'])
+            self.state_names: dict[str, list[str]] = header['states']
+            artifact_intervals = header.get('intervals') or {}
+        else:
+            view = ModelView.from_model(joblib.load(path))
+            self.nodes, self.edges, self.state_names = view.nodes, view.edges, view.state_names
+            artifact_intervals = view.intervals
+        self.node_set: frozenset[str] = frozenset(self.nodes)
+        # numeric evidence is discretized without loading the model (e.g. for coalescing keys)
+        self.intervals = load_intervals(self.nodes, self.state_names, artifact_intervals)
+        self.interval_indexes = {node: IntervalIndex(intervals) for node, intervals in self.intervals.items()}
+        self.network_structure: dict[str, list[dict]] | None = None
+
+
+    def get_name(self) -> str:
+        """Returns the model name.
+
+        Returns:
+            str: Model name
+        """
+        return self.name
+
+
+    def get_version(self) -> str:
+        """Returns the version of the model (hash of the model files).
+
+        Returns:
+            str: Model version
+        """
+        return self.version
+
+
+    def get_nodes(self) -> tuple[str, ...]:
+        """Returns all nodes of the model.
+
+        Returns:
+            tuple[str, ...]: Model nodes
+        """
+        return self.nodes
+
+
+    def get_state_names(self, node: str) -> list[str]:
+        """Returns the state names of a node.
+
+        Args:
+            node (str): Node name
+
+        Returns:
+            list[str]: State names (must not be changed)
+        """
+        return self.state_names[node]
+
+
+    def filter_evidence(self, evidence: dict) -> dict:
+        """Filters and discretizes evidence like Model.filter_evidence, without loading the model.
+
+        Args:
+            evidence (dict): Evidence as node -> state name or numeric value
+
+        Returns:
+            dict: Evidence of the nodes of the model, numeric values replaced by their interval
+        """
+        return filter_evidence(self.name, evidence, self.node_set, self.intervals, self.interval_indexes)
+
+
+    def get_network_structure(self) -> dict[str, list[dict]]:
+        """Returns the structure of the bayesian network, which is only built once per model version.
+
+        Returns:
+            dict[str, list[dict]]: Structure of the bayesian model grouped by nodes and edges/links
+                (must not be changed)
+        """
+        if self.network_structure is None:
+            self.network_structure = build_network_structure(self.nodes, self.edges, load_group_index())
+        return self.network_structure
+
+
+class ModelPool:
+    """Loads models on first use and keeps at most a maximum number of them loaded. If the pool is
+    full, the least recently used model is unloaded (together with its caches).
+    """
+    def __init__(self, models: list[ModelMetadata], max_loaded: int | None = None):
+        """Initializes the pool without loading any model.
+
+        Args:
+            models (list[ModelMetadata]): Metadata of the registered models
+            max_loaded (int | None, optional): Maximum number of loaded models. Defaults to None (no limit).
+        """
+        self.metadata: dict[str, ModelMetadata] = {model.get_name(): model for model in models}
+        self.max_loaded = max_loaded
+        self.loaded: OrderedDict[str, Model] = OrderedDict()
+        self.lock = threading.Lock()
+        # models are loaded outside of the pool lock, but every model only once at a time
+        self.loading_locks: dict[str, threading.Lock] = {name: threading.Lock() for name in self.metadata}
+        self.stats = {'loads': 0, 'unloads': 0, 'hits': 0}
+        self.preload_thread: threading.Thread | None = None
+
+
+    def get(self, model_name: str) -> 'Model':
+        """Returns a model, which is loaded if it is not loaded yet.
+
+        Args:
+            model_name (str): Model name
+
+        Raises:
+            KeyError: If the model is not registered
+
+        Returns:
+            Model: Model
+        """
+        if model_name not in self.metadata:
+            raise KeyError(f'Unknown model "{model_name}"')
+        with self.lock:
+            model = self.loaded.get(model_name)
+            if model is not None:
+                self.loaded.move_to_end(model_name)
+                self.stats['hits'] += 1
+                return model
+        with self.loading_locks[model_name]:
+            with self.lock:
+                model = self.loaded.get(model_name)
+            if model is None:
+                start_time = time.time()
+                metadata = self.metadata[model_name]
+                model = Model(model_name, metadata.path, metadata.inference_mode)
+                logger.info('Model loaded', extra={'model': model_name, 'seconds': time.time() - start_time})
+            with self.lock:
+                self.loaded[model_name] = model
+                self.loaded.move_to_end(model_name)
+                self.stats['loads'] += 1
+                while self.max_loaded is not None and len(self.loaded) > self.max_loaded:
+                    unloaded_name, _ = self.loaded.popitem(last=False)
+                    self.stats['unloads'] += 1
+                    logger.info('Model unloaded', extra={'model': unloaded_name})
+        return model
+
+
+    def preload(self, model_names: list[str]) -> None:
+        """Loads models in a background thread.
+
+        Args:
+            model_names (list[str]): Model names
+        """
+        self.preload_thread = threading.Thread(target=lambda: [self.get(name) for name in model_names], daemon=True)
+        self.preload_thread.start()
+
+
+    def wait_for_preload(self) -> None:
+        """Waits until all preloaded models are loaded.
+        """
+        if self.preload_thread is not None:
+            self.preload_thread.join()
+
+
+    def get_loaded(self) -> list['Model']:
+        """Returns all loaded models.
+
+        Returns:
+            list[Model]: Loaded models (least recently used first)
+        """
+        with self.lock:
+            return list(self.loaded.values())
+
+
+    def get_stats(self) -> dict[str, int]:
+        """Returns the pool statistics.
+
+        Returns:
+            dict[str, int]: Number of loaded models and number of loads, unloads and hits
+        """
+        with self.lock:
+            return {'loaded': len(self.loaded), **self.stats}
 
 
 class Model:
     """Class managing a single bayesian network model.
     """
-    def __init__(self, name: str, path: str):
+    def __init__(self, name: str, path: str, inference_mode: str = 'variable_elimination',
+                 cache_entries: int = 1024, cache_bytes: int = 64 * 1024**2, max_sessions: int = 256,
+                 max_samples: int = 100000):
         """Initializes a model.
 
         Args:
             name (str): Name of model
-            path (str): Path to stored model (saved with joblib/as '.pkl')
+            path (str): Path to stored model, either a model artifact ('.json' header with a '.npy' file
+                next to it, see ModelView.load) or a pgmpy model saved with joblib ('.pkl'). The CPD
+                arrays of model artifacts are memory mapped read-only, so forked workers share their pages.
+            inference_mode (str, optional): Inference engine, one of INFERENCE_MODES.
+                'junction_tree' calibrates a compiled clique tree once per evidence set instead of
+                running one variable elimination per node, 'einsum' evaluates every query as cached
+                NumPy contraction path, 'likelihood_weighting' estimates the posteriors by sampling.
+                Defaults to 'variable_elimination'.
+            cache_entries (int, optional): Maximum number of evidence sets in the posterior cache. Defaults to 1024.
+            cache_bytes (int, optional): Maximum size of the posterior cache in bytes. Defaults to 64 MiB.
+            max_sessions (int, optional): Maximum number of (session, case) calibrations which are kept
+                for incremental updates in 'junction_tree' mode. Defaults to 256.
+            max_samples (int, optional): Sample budget of the approximate inference. Defaults to 100000.
         """
+        if inference_mode not in INFERENCE_MODES:
+            raise ValueError(f'Unknown inference mode "{inference_mode}". Possible modes: {INFERENCE_MODES}')
         self.name = name
         self.path = path
-        self.model: DiscreteBayesianNetwork = joblib.load(path)
-        self.infer = VariableElimination(self.model)
-        self.approx_infer = ApproxInference(self.model)
+        self.inference_mode = inference_mode
+        self.model: DiscreteBayesianNetwork | None = None
+        if path.endswith('.json'):
+            self.view = ModelView.load(path, mmap_mode='r')
+        else:
+            self.model = joblib.load(path)
+            self.view = ModelView.from_model(self.model)
+        self.infer: PlannedVariableElimination | None = None
+        if inference_mode == 'variable_elimination':
+            self.infer = PlannedVariableElimination(self.get_bayesian_network())
+        self.approx_infer = LikelihoodWeighting(self.view)
+        self.max_samples = max_samples
+        self.relevance = RelevanceReducer(self.view)
+        self.junction_tree: JunctionTree | None = None
+        if inference_mode == 'junction_tree':
+            self.junction_tree = JunctionTree(self.view)
+        self.einsum_engine: EinsumEngine | None = None
+        if inference_mode == 'einsum':
+            self.einsum_engine = EinsumEngine(self.view, self.relevance)
+        self.posterior_cache = PosteriorCache(cache_entries, cache_bytes)
+        self.max_sessions = max_sessions
+        self.calibrations: OrderedDict[tuple, Calibration] = OrderedDict()
+        self.calibration_stats = {'full': 0, 'incremental': 0}
+        self.calibrations_lock = threading.Lock()
+        self.ig_stats = {'requests': 0, 'candidates': 0, 'skipped': 0}
+        self.ig_stats_lock = threading.Lock()
         self.intervals = {}
+        self.interval_indexes: dict[str, IntervalIndex] = {}
         self.load_all_intervals()
 
 
@@ -101,17 +875,36 @@ class Model:
         return f'{self.name}: {self.path}'
     
     
-    def get_nodes(self) -> list[str]:
+    def get_bayesian_network(self) -> DiscreteBayesianNetwork:
+        """Returns the pgmpy model, which is only built from the view when it is needed.
+
+        Returns:
+            DiscreteBayesianNetwork: Bayesian network
+        """
+        if self.model is None:
+            self.model = self.view.to_bayesian_network()
+        return self.model
+
+
+    def get_nodes(self) -> tuple[str, ...]:
         """Returns all nodes of the model.
 
         Returns:
-            list[str]: Model nodes
+            tuple[str, ...]: Model nodes
         """
-        return list(self.model.nodes())
+        return self.view.nodes
     
 
     def get_state_names(self, node: str) -> list[str]:
-        return self.model.get_cpds(node).state_names[node]
+        """Returns the state names of a node.
+
+        Args:
+            node (str): Node name
+
+        Returns:
+            list[str]: State names (must not be changed)
+        """
+        return self.view.state_names[node]
     
     
     def convert_numeric_value_to_interval(self, node: str, value: int | float) -> str|None:
@@ -124,26 +917,33 @@ class Model:
         Returns:
             str|None: Returns the pandas.Interval as string. If no interval fits it returns None
         """
-        for interval in self.intervals[node]:
-            if value in interval:
-                return str(interval)
-        return None
-    # ToDo: add option for nearest interval    
-    # if value <= self.intervals[node][0].left:
-    #     return str(self.intervals[node][0])
-    # if value >= self.intervals[node][-1].right:
-    #     return str(self.intervals[node][-1])
-    
+        # ToDo: add option for nearest interval
+        # if value <= self.intervals[node][0].left:
+        #     return str(self.intervals[node][0])
+        # if value >= self.intervals[node][-1].right:
+        #     return str(self.intervals[node][-1])
+        return self.interval_indexes[node].convert(value)
+
+
+    def convert_numeric_values_to_intervals(self, node: str, values: np.ndarray) -> np.ndarray:
+        """Converts numeric values to the associated intervals (vectorized variant of
+        convert_numeric_value_to_interval).
+
+        Args:
+            node (str): Node with intervals
+            values (np.ndarray): Numbers which should be converted (NaN for missing values)
+
+        Returns:
+            np.ndarray: The pandas.Intervals as strings, None where no interval fits
+        """
+        return self.interval_indexes[node].convert_array(values)
+
 
     def load_all_intervals(self) -> None:
         """Loads all intervals of the model as pandas.Interval.
         """
-        for node in self.get_nodes():
-            self.intervals[node] = []
-            for state_name in self.get_state_names(node):
-                if '(' not in str(state_name) and '[' not in str(state_name):
-                    break
-                self.intervals[node].append(string_to_pandas_interval(state_name))
+        self.intervals = load_intervals(self.get_nodes(), self.view.state_names, self.view.intervals)
+        self.interval_indexes = {node: IntervalIndex(intervals) for node, intervals in self.intervals.items()}
 
 
     def get_intervals(self) -> dict[str, list[pd.Interval]]:
@@ -155,57 +955,86 @@ class Model:
         return self.intervals
 
 
-    def get_inference(self, evidence: dict, target_node: None | str = None) -> dict[str, dict]:
+    def get_inference(self, evidence: dict, target_node: None | str = None, session_key: tuple | None = None,
+                      compact: bool = False) -> dict[str, dict | list[int] | int]:
         """Returns the probabilities of all nodes with respect to given evidence.
 
         Args:
             evidence (dict): Evidence for prediction
+            target_node (None | str, optional): If given, only the posterior of this node is returned. Defaults to None.
+            session_key (tuple | None, optional): (session, case) of the query for incremental updates. Defaults to None.
+            compact (bool, optional): If True, the probabilities of a node are a list of integer permille values
+                in the order of its state names and observed nodes are only the index of their state.
+                Defaults to False.
 
         Returns:
-            dict[str, dict]: Inference results grouped by nodes
+            dict[str, dict | list[int] | int]: Inference results grouped by nodes (state -> percent, or the compact format)
         """
-        # start_time = time.time()
-        evidence_filtered = {key: value for key, value in evidence.items() if key in self.get_nodes()}
-        
-        infer_nodes = [node for node in self.get_nodes() if node not in evidence_filtered.keys()]
+        evidence_filtered = self.filter_evidence(evidence, [])
         
-        for node in [node for node in self.intervals.keys() if node not in infer_nodes and self.intervals[node] != []]:
-            if ', ' in evidence[node]:
-                continue
-            interval = self.convert_numeric_value_to_interval(node, float(evidence[node]))
-            if interval is None:
-                evidence_filtered.pop(node)
-            else:
-                evidence_filtered[node] = self.convert_numeric_value_to_interval(node, float(evidence[node]))
+        infer_nodes = [node for node in self.get_nodes() if node not in evidence_filtered]
 
-        # print(f'Evidence clean up: {time.time()-start_time}')
         if target_node is not None:
-            infer_nodes = [target_node]
+            return self.get_single_inference(evidence_filtered, target_node)
+
+        posteriors = self.get_posteriors(evidence_filtered, infer_nodes, session_key)
+        if compact:
+            infer_results = {node: to_permille(posterior) for node, posterior in posteriors.items()}
+            infer_results.update(self.view.encode_evidence(evidence_filtered))
+            return infer_results
 
         infer_results = {}
-        for node in infer_nodes:
-            result = self.infer.query(variables=[node], evidence=evidence_filtered)
-            if target_node is not None:
-                return result
-            infer_results[node] = dict(zip(result.state_names[node], result.values.round(4)*100))
-        # print(f'Inference: {time.time()-start_time}')
+        for node, posterior in posteriors.items():
+            infer_results[node] = dict(zip(self.get_state_names(node), posterior.round(4)*100))
         
         for key, value in evidence_filtered.items():
             infer_results[key] = {value: 100}
 
         return infer_results
-    
-    def filter_evidence(self, evidence: dict, ignore_nodes: list[str]):
-        evidence_filtered = {key: value for key, value in evidence.items() if key in self.get_nodes()}
-        for node in [node for node in self.intervals.keys() if node in evidence.keys() and self.intervals[node] != []]:
-            if ', ' in evidence[node]:
-                continue
-            interval = self.convert_numeric_value_to_interval(node, float(evidence[node]))
-            if interval is None:
-                evidence_filtered.pop(node)
+
+
+    def get_approximate_inference(self, evidence: dict, time_budget: float | None = None,
+                                  compact: bool = False) -> tuple[dict[str, dict | list[int] | int], dict]:
+        """Returns the estimated probabilities of all nodes with respect to given evidence (likelihood weighting).
+
+        Args:
+            evidence (dict): Evidence for prediction
+            time_budget (float | None, optional): Sampling time in seconds. Defaults to None (only the sample budget).
+            compact (bool, optional): If True, the results use the compact format (see get_inference).
+                The confidence intervals keep their format. Defaults to False.
+
+        Returns:
+            tuple[dict[str, dict], dict]: Inference results grouped by nodes (like get_inference) and the
+                confidence intervals grouped by nodes and states, number of samples and effective sample size
+        """
+        evidence_filtered = self.filter_evidence(evidence, [])
+        infer_nodes = [node for node in self.get_nodes() if node not in evidence_filtered]
+        result = self.approx_infer.query(infer_nodes, self.view.encode_evidence(evidence_filtered), self.max_samples, time_budget)
+
+        infer_results = {}
+        intervals = {}
+        for node in infer_nodes:
+            if compact:
+                infer_results[node] = to_permille(result.posteriors[node])
             else:
-                evidence_filtered[node] = self.convert_numeric_value_to_interval(node, float(evidence[node]))
-        return evidence_filtered
+                infer_results[node] = dict(zip(self.get_state_names(node), result.posteriors[node].round(4)*100))
+            intervals[node] = {state: [lower, upper] for state, lower, upper
+                               in zip(self.get_state_names(node), result.lower[node].round(4)*100, result.upper[node].round(4)*100)}
+        if compact:
+            infer_results.update(self.view.encode_evidence(evidence_filtered))
+        else:
+            for key, value in evidence_filtered.items():
+                infer_results[key] = {value: 100}
+        approximation = {
+            'intervals': intervals,
+            'samples': result.samples,
+            'effective_sample_size': round(result.effective_sample_size, 1),
+        }
+        return infer_results, approximation
+
+
+    def filter_evidence(self, evidence: dict, ignore_nodes: list[str]):
+        return filter_evidence(self.name, evidence, self.view.node_set, self.intervals, self.interval_indexes)
 
 
     def get_single_inference(self, filtered_evidence: dict, infer_node: str) -> dict[str, dict]:
@@ -217,11 +1046,158 @@ class Model:
         Returns:
             dict[str, dict]: Inference results grouped by nodes
         """
+        posterior = self.get_posteriors(filtered_evidence, [infer_node])[infer_node]
+        return self.marginal_to_factor(infer_node, posterior)
+
+
+    def get_posteriors(self, filtered_evidence: dict, nodes: list[str], session_key: tuple | None = None) -> dict[str, np.ndarray]:
+        """Returns the posterior distributions of nodes.
+
+        Args:
+            filtered_evidence (dict): Evidence (filtered and discretized)
+            nodes (list[str]): Nodes to infer
+            session_key (tuple | None, optional): (session, case) of the query for incremental updates. Defaults to None.
+
+        Returns:
+            dict[str, np.ndarray]: Posteriors (ordered like the state names) grouped by node
+        """
+        return self.get_posteriors_of_codes(self.view.encode_evidence(filtered_evidence), nodes, session_key)
+
+
+    def get_posteriors_of_codes(self, codes: dict[str, int], nodes: list[str], session_key: tuple | None = None) -> dict[str, np.ndarray]:
+        """Returns the posterior distributions of nodes for encoded evidence. Posteriors are looked up in
+        the posterior cache first, which is keyed by the canonical form of the evidence.
+
+        Args:
+            codes (dict[str, int]): Evidence as node -> state index
+            nodes (list[str]): Nodes to infer
+            session_key (tuple | None, optional): (session, case) of the query for incremental updates. Defaults to None.
+
+        Returns:
+            dict[str, np.ndarray]: Posteriors (ordered like the state names) grouped by node
+        """
+        if self.inference_mode == 'likelihood_weighting':
+            return self.approx_infer.query(nodes, codes, self.max_samples).posteriors
+        if self.junction_tree is None:
+            return self.get_reduced_posteriors(codes, nodes)
+        key = self.view.evidence_key(codes)
+        posteriors = self.posterior_cache.get(key, nodes)
+        if any(node not in posteriors for node in nodes):
+            # one calibration yields the posteriors of all nodes
+            calibration = self.get_calibration(codes, session_key)
+            computed = calibration.get_marginals([node for node in self.get_nodes()
+                                                  if node not in codes or node in nodes])
+            self.posterior_cache.put(key, computed)
+            posteriors = {**posteriors, **computed}
+        return {node: posteriors[node] for node in nodes}
+
+
+    def get_calibration(self, codes: dict[str, int], session_key: tuple | None = None) -> Calibration:
+        """Calibrates the junction tree for the evidence. If the previous query of the same session and
+        case only differs in a few evidence variables (e.g. one changed feature of a what-if analysis),
+        only the affected messages are recomputed.
+
+        Args:
+            codes (dict[str, int]): Evidence as node -> state index
+            session_key (tuple | None, optional): (session, case) of the query. Defaults to None.
+
+        Returns:
+            Calibration: Calibrated junction tree
+        """
+        previous = None
+        if session_key is not None:
+            with self.calibrations_lock:
+                previous = self.calibrations.get(session_key)
+        if previous is None:
+            calibration = self.junction_tree.calibrate(codes)
+        else:
+            calibration = self.junction_tree.update(previous, codes)
+        with self.calibrations_lock:
+            self.calibration_stats['full' if previous is None else 'incremental'] += 1
+            if session_key is not None:
+                self.calibrations[session_key] = calibration
+                self.calibrations.move_to_end(session_key)
+                while len(self.calibrations) > self.max_sessions:
+                    self.calibrations.popitem(last=False)
+        return calibration
+
+
+    def get_calibration_stats(self) -> dict[str, int]:
+        """Returns how many junction tree calibrations were computed from scratch and incrementally.
+
+        Returns:
+            dict[str, int]: Number of full and incremental calibrations and kept session calibrations
+        """
+        with self.calibrations_lock:
+            return {**self.calibration_stats, 'sessions': len(self.calibrations)}
+
+
+    def get_reduced_posteriors(self, codes: dict[str, int], nodes: list[str]) -> dict[str, np.ndarray]:
+        """Returns the posterior distributions of nodes, each node is inferred on its minimal sub-network.
+        Evidence which does not influence a node is dropped before the posterior cache lookup, so
+        queries which only differ in irrelevant evidence share one cache entry.
+
+        Args:
+            codes (dict[str, int]): Evidence as node -> state index
+            nodes (list[str]): Nodes to infer
+
+        Returns:
+            dict[str, np.ndarray]: Posteriors (ordered like the state names) grouped by node
+        """
+        posteriors = {}
+        for node in nodes:
+            relevant_evidence = self.relevance.reduce_evidence([node], codes)
+            key = self.view.evidence_key(relevant_evidence)
+            cached = self.posterior_cache.get(key, [node])
+            if node in cached:
+                posteriors[node] = cached[node]
+                continue
+            if self.einsum_engine is not None:
+                posteriors[node] = self.einsum_engine.query([node], relevant_evidence)
+            else:
+                posteriors[node] = self.infer.query(variables=[node], evidence=self.view.decode_evidence(relevant_evidence)).values
+            self.posterior_cache.put(key, {node: posteriors[node]})
+        return posteriors
+
+
+    def get_query_plan_stats(self) -> dict[str, int | float]:
+        """Returns the query plan cache statistics of the used inference engine.
+
+        Returns:
+            dict[str, int | float]: Plan cache statistics (empty for the junction tree and sampling, which have no per query plans)
+        """
+        if self.junction_tree is not None:
+            return {}
+        if self.einsum_engine is not None:
+            return self.einsum_engine.get_stats()
+        if self.infer is None:
+            return {}
+        return self.infer.get_stats()
+
+
+    def marginal_to_factor(self, node: str, marginal: np.ndarray) -> DiscreteFactor:
+        """Wraps a marginal distribution into a pgmpy factor, like it is returned by VariableElimination.
 
-        result = self.infer.query(variables=[infer_node], evidence=filtered_evidence)
-        return result
+        Args:
+            node (str): Node name
+            marginal (np.ndarray): Probabilities ordered like the state names of the node
+
+        Returns:
+            DiscreteFactor: Factor over the node
+        """
+        return DiscreteFactor([node], [len(marginal)], marginal, state_names={node: self.get_state_names(node)})
     
     
+    def get_memory_stats(self) -> dict[str, int | bool]:
+        """Returns the size of the CPD arrays and if they are memory mapped.
+
+        Returns:
+            dict[str, int | bool]: 'cpd_bytes' and 'cpd_memory_mapped'
+        """
+        return {'cpd_bytes': sum(table.nbytes for table in self.view.tables.values()),
+                'cpd_memory_mapped': all(isinstance(table, np.memmap) for table in self.view.tables.values())}
+
+
     def get_name(self) -> str:
         """Returns the name of the model.
 
@@ -237,29 +1213,164 @@ class Model:
         Returns:
             dict[str, list[dict]]: Structure of the bayesian model grouped by nodes and edges/links
         """
-        BASE_DIR = os.path.dirname(__file__)
-        with open(f'{BASE_DIR}/data/criteria_settings.json') as f:
-            additional_network_data = json.load(f)
-        
-        return {
-            'nodes': [{"id": node, 'group_name': get_group_name(node, additional_network_data)} for node in self.model.nodes()],
-            'links': [{"source": u, "target": v} for u, v in self.model.edges()]
-        }
+        return build_network_structure(self.view.nodes, self.view.edges, load_group_index())
     
 
-    def get_information_gain_of_all_nodes(self, evidence: dict, target_node: str = 'Diagnose'):
+    def get_information_gain_of_all_nodes(self, evidence: dict, target_node: str = 'Diagnose', session_key: tuple | None = None):
+        if self.inference_mode == 'likelihood_weighting':
+            return self.get_approximate_information_gain(evidence, target_node)
         filtered_evidence = self.filter_evidence(evidence, [])
+        candidates = self.get_information_gain_candidates(filtered_evidence, target_node)
+        if self.junction_tree is not None:
+            return self.get_batched_information_gain(filtered_evidence, candidates, target_node, session_key)
         ig = {}
         base_prob = self.get_single_inference(filtered_evidence, target_node)
         base_entropy = entropy(base_prob.values, base=2)
         for node in [node for node in self.get_nodes()]:
-            if node == target_node or node in filtered_evidence:
+            if node not in candidates:
                 ig[node] = 0
                 continue
             ig[node] = self.get_information_gain_of_node(filtered_evidence, node, base_entropy, target_node)
         return ig
 
 
+    def get_information_gain_candidates(self, filtered_evidence: dict, target_node: str = 'Diagnose') -> list[str]:
+        """Returns all unobserved nodes which are d-connected to the target node given the evidence.
+        The information gain of all other nodes is exactly 0, so they are skipped without any inference.
+
+        Args:
+            filtered_evidence (dict): Evidence (filtered and discretized)
+            target_node (str, optional): Target node. Defaults to 'Diagnose'.
+
+        Returns:
+            list[str]: Candidate nodes
+        """
+        connected_nodes = self.relevance.get_relevant_network((target_node,), frozenset(filtered_evidence)).connected_nodes
+        candidates = [node for node in self.get_nodes() if node in connected_nodes]
+        unobserved = [node for node in self.get_nodes() if node != target_node and node not in filtered_evidence]
+        skipped = len(unobserved) - len(candidates)
+        with self.ig_stats_lock:
+            self.ig_stats['requests'] += 1
+            self.ig_stats['candidates'] += len(unobserved)
+            self.ig_stats['skipped'] += skipped
+        logger.debug('Information gain candidates', extra={'model': self.name, 'candidates': len(unobserved),
+                                                           'd_separated': skipped, 'target_node': target_node})
+        return candidates
+
+
+    def get_information_gain_stats(self) -> dict[str, int | float]:
+        """Returns how many information gain candidates were skipped because they are d-separated from the target.
+
+        Returns:
+            dict[str, int | float]: Number of requests, unobserved candidates, skipped candidates and skipped share
+        """
+        with self.ig_stats_lock:
+            stats = dict(self.ig_stats)
+        stats['skipped_share'] = stats['skipped'] / stats['candidates'] if stats['candidates'] else 0.0
+        return stats
+
+
+    def get_batched_information_gain(self, filtered_evidence: dict, candidates: list[str],
+                                     target_node: str = 'Diagnose', session_key: tuple | None = None) -> dict[str, float]:
+        """Returns the information gain of all nodes with respect to the target node. All joint
+        posteriors P(target, node | evidence) come from one shared junction tree computation and
+        the expected conditional entropies are computed vectorized for all nodes at once.
+
+        Args:
+            filtered_evidence (dict): Evidence (filtered and discretized)
+            candidates (list[str]): Nodes whose information gain is computed, all other nodes get 0
+            target_node (str, optional): Target node. Defaults to 'Diagnose'.
+            session_key (tuple | None, optional): Session of the query for incremental updates. Defaults to None.
+
+        Returns:
+            dict[str, float]: Information gain grouped by node
+        """
+        target_marginal, joints = self.get_joint_posteriors(filtered_evidence, candidates, target_node, session_key)
+        return self.get_information_gain_of_joints(target_marginal, joints)
+
+
+    def get_approximate_information_gain(self, evidence: dict, target_node: str = 'Diagnose',
+                                         time_budget: float | None = None) -> dict[str, float]:
+        """Returns the estimated information gain of all nodes with respect to the target node. All joint
+        posteriors P(target, node | evidence) are estimated from the same likelihood weighted samples.
+
+        Args:
+            evidence (dict): Evidence
+            target_node (str, optional): Target node. Defaults to 'Diagnose'.
+            time_budget (float | None, optional): Sampling time in seconds. Defaults to None (only the sample budget).
+
+        Returns:
+            dict[str, float]: Information gain grouped by node
+        """
+        filtered_evidence = self.filter_evidence(evidence, [])
+        candidates = self.get_information_gain_candidates(filtered_evidence, target_node)
+        result = self.approx_infer.query([target_node] + candidates, self.view.encode_evidence(filtered_evidence), self.max_samples,
+                                         time_budget, target_node)
+        return self.get_information_gain_of_joints(result.posteriors[target_node], result.joints)
+
+
+    def get_information_gain_of_joints(self, target_marginal: np.ndarray, joints: dict[str, np.ndarray]) -> dict[str, float]:
+        """Computes the information gain of nodes from their joint posteriors with the target node,
+        vectorized for all nodes at once.
+
+        Args:
+            target_marginal (np.ndarray): Posterior of the target node
+            joints (dict[str, np.ndarray]): Joint posteriors (shape: node states x target states) grouped by node
+
+        Returns:
+            dict[str, float]: Information gain grouped by node (0 for all nodes without joint posterior)
+        """
+        ig = {node: 0 for node in self.get_nodes()}
+        if not joints:
+            return ig
+        base_entropy = entropy(target_marginal, base=2)
+
+        # pad all joint tables to the same number of node states, padded states have a probability of 0
+        max_states = max(joint.shape[0] for joint in joints.values())
+        joint_table = np.zeros((len(joints), max_states, len(target_marginal)))
+        for index, joint in enumerate(joints.values()):
+            joint_table[index, :joint.shape[0]] = joint
+
+        state_probs = joint_table.sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            posteriors = joint_table / state_probs[:, :, np.newaxis]
+            cond_entropies = -np.sum(np.where(posteriors > 0, posteriors * np.log2(posteriors), 0), axis=2)
+        # like get_information_gain_of_node: states with a negligible probability are skipped
+        expected_conditional_entropy = np.where(state_probs < 0.00001, 0, state_probs * cond_entropies).sum(axis=1)
+        for node, node_ig in zip(joints.keys(), base_entropy - expected_conditional_entropy):
+            ig[node] = float(node_ig)
+        return ig
+
+
+    def get_joint_posteriors(self, filtered_evidence: dict, nodes: list[str], target_node: str,
+                             session_key: tuple | None = None) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        """Returns the posterior of the target node and the joint posteriors P(node, target | evidence)
+        of the given unobserved nodes. It needs one posterior query per possible target state
+        (P(node, target | e) = P(target | e) * P(node | e, target)) instead of one per node state.
+
+        Args:
+            filtered_evidence (dict): Evidence (filtered and discretized)
+            nodes (list[str]): Unobserved nodes (without the target node)
+            target_node (str): Target node
+            session_key (tuple | None, optional): Session of the query for incremental updates. Consecutive
+                hypothetical target states only differ in one evidence variable. Defaults to None.
+
+        Returns:
+            tuple[np.ndarray, dict[str, np.ndarray]]: Posterior of the target node and joint posteriors
+                (shape: node states x target states) grouped by node
+        """
+        codes = self.view.encode_evidence(filtered_evidence)
+        target_marginal = self.get_posteriors_of_codes(codes, [target_node], session_key)[target_node]
+        joints = {node: np.zeros((self.view.cardinality[node], len(target_marginal))) for node in nodes}
+        for state_index, state_prob in enumerate(target_marginal):
+            if not state_prob > 0:
+                continue
+            hypothetical_codes = {**codes, target_node: state_index}
+            for node, posterior in self.get_posteriors_of_codes(hypothetical_codes, nodes, session_key).items():
+                joints[node][:, state_index] = state_prob * posterior
+        return target_marginal, joints
+
+
     def get_information_gain_of_node(self, filtered_evidence: dict, node: str, base_entropy, target_node: str = 'Diagnose'):
         if node in filtered_evidence.keys(): return 0
         
@@ -281,15 +1392,118 @@ class Model:
         return base_entropy - expected_conditional_entropy
     
 
-def get_group_name(feature_name: str, network_data):
-    if feature_name == 'Diagnose':
-        return 'Diagnose'
-    for group in network_data:
+def observe_task(model_name: str, method: str, seconds: float) -> None:
+    """Records the duration of a model task in the inference or information gain histogram.
+
+    Args:
+        model_name (str): Model name
+        method (str): Method name of Model
+        seconds (float): Duration
+    """
+    histogram = INFORMATION_GAIN_SECONDS if 'information_gain' in method else INFERENCE_SECONDS
+    histogram.observe(seconds, model=model_name, method=method)
+
+
+def load_group_index() -> dict[str, str]:
+    """Loads the group of every feature from the criteria settings.
+
+    Returns:
+        dict[str, str]: Group name grouped by feature name (the first group of a feature wins)
+    """
+    BASE_DIR = os.path.dirname(__file__)
+    with open(f'{BASE_DIR}/data/criteria_settings.json', encoding='utf-8') as f:
+        additional_network_data = json.load(f)
+
+    group_index = {'Diagnose': 'Diagnose'}
+    for group in additional_network_data:
         for feature in group.get("features", []):
-            if feature.get("name") == feature_name:
-                return group.get("group_name")
+            group_index.setdefault(feature.get("name"), group.get("group_name"))
+    return group_index
+
+
+def build_network_structure(nodes: tuple[str, ...], edges: tuple[tuple[str, str], ...],
+                            group_index: dict[str, str]) -> dict[str, list[dict]]:
+    """Builds the structure of a bayesian network for the network plot.
+
+    Args:
+        nodes (tuple[str, ...]): Nodes
+        edges (tuple[tuple[str, str], ...]): Edges as (parent, child)
+        group_index (dict[str, str]): Group name grouped by feature name (see load_group_index)
+
+    Returns:
+        dict[str, list[dict]]: Structure of the bayesian model grouped by nodes and edges/links
+    """
+    return {
+        'nodes': [{"id": node, 'group_name': group_index.get(node)} for node in nodes],
+        'links': [{"source": u, "target": v} for u, v in edges]
+    }
+
+
+def get_candidate_counts(ig_stats: dict[str, int | float]) -> dict[str, int]:
+    """Splits the information gain candidates of a model into computed and skipped candidates.
+
+    Args:
+        ig_stats (dict[str, int | float]): Information gain statistics (see Model.get_information_gain_stats)
+
+    Returns:
+        dict[str, int]: Number of 'computed' and 'skipped' candidates
+    """
+    return {'computed': ig_stats['candidates'] - ig_stats['skipped'], 'skipped': ig_stats['skipped']}
+
+
+def load_intervals(nodes: tuple[str, ...], state_names: dict[str, list[str]],
+                   artifact_intervals: dict[str, list]) -> dict[str, list[pd.Interval]]:
+    """Returns the intervals of all nodes (empty for nodes without numeric states).
+
+    Args:
+        nodes (tuple[str, ...]): Nodes
+        state_names (dict[str, list[str]]): State names grouped by node
+        artifact_intervals (dict[str, list]): Intervals as (left, right, closed) grouped by node, which
+            the model artifact already contains, all other intervals are parsed from the state names
+
+    Returns:
+        dict[str, list[pd.Interval]]: Intervals grouped by node
+    """
+    intervals = {}
+    for node in nodes:
+        if node in artifact_intervals:
+            intervals[node] = [pd.Interval(left, right, closed) for left, right, closed in artifact_intervals[node]]
+            continue
+        intervals[node] = []
+        for state_name in state_names[node]:
+            if '(' not in str(state_name) and '[' not in str(state_name):
+                break
+            intervals[node].append(string_to_pandas_interval(state_name))
+    return intervals
+
+
+def filter_evidence(model_name: str, evidence: dict, node_set: frozenset[str], intervals: dict[str, list[pd.Interval]],
+                    interval_indexes: dict[str, IntervalIndex]) -> dict:
+    """Keeps the evidence of the nodes of a model and replaces numeric values by their interval.
+
+    Args:
+        model_name (str): Model name (metric label)
+        evidence (dict): Evidence as node -> state name or numeric value
+        node_set (frozenset[str]): Nodes of the model
+        intervals (dict[str, list[pd.Interval]]): Intervals grouped by node
+        interval_indexes (dict[str, IntervalIndex]): Interval indexes grouped by node
+
+    Returns:
+        dict: Filtered evidence, numeric values without interval are dropped
+    """
+    start_time = time.perf_counter()
+    evidence_filtered = {key: value for key, value in evidence.items() if key in node_set}
+    for node in [node for node in intervals.keys() if node in evidence.keys() and intervals[node] != []]:
+        if ', ' in evidence[node]:
+            continue
+        interval = interval_indexes[node].convert(float(evidence[node]))
+        if interval is None:
+            evidence_filtered.pop(node)
+        else:
+            evidence_filtered[node] = interval
+    EVIDENCE_FILTER_SECONDS.observe(time.perf_counter() - start_time, model=model_name)
+    return evidence_filtered
 
- 
 
 def string_to_pandas_interval(interval: str) -> pd.Interval:
     """Converts a interval string to a pandas.Interval
@@ -0,0 +1,175 @@
+from collections import OrderedDict
+import threading
+import numpy as np
+from opt_einsum import contract, contract_path
+from pgmpy.inference import VariableElimination
+from pgmpy.factors.discrete import DiscreteFactor
+from pgmpy.models import DiscreteBayesianNetwork
+
+
+class QueryPlan:
+    """Query plan of one (query variables, evidence variables) pattern: the pruned factor list and
+    the elimination order (contraction path) over these factors.
+    """
+    def __init__(self, factors: list, evidence_variables: set[str], variables: list[str], path: list[tuple[int, ...]],
+                 operand_indices: list[list[int]], output_indices: list[int], state_names: dict[str, list]):
+        """Initializes the plan.
+
+        Args:
+            factors (list): CPDs of the pruned network, which take part in the contraction
+            evidence_variables (set[str]): Evidence variables which are still relevant after pruning
+            variables (list[str]): Query variables
+            path (list[tuple[int, ...]]): Contraction path (elimination order) of the factors
+            operand_indices (list[list[int]]): Einsum indices of every factor (without evidence variables)
+            output_indices (list[int]): Einsum indices of the query variables
+            state_names (dict[str, list]): State names of the query variables
+        """
+        self.factors = factors
+        self.evidence_variables = evidence_variables
+        self.variables = variables
+        self.path = path
+        self.operand_indices = operand_indices
+        self.output_indices = output_indices
+        self.state_names = state_names
+        # axes of every factor, which get sliced by evidence
+        self.evidence_axes = [[(axis, variable) for axis, variable in enumerate(factor.variables)
+                               if variable in evidence_variables] for factor in factors]
+
+
+class PlannedVariableElimination(VariableElimination):
+    """Variable elimination, which caches its query plans per (query variables, evidence variables) pattern.
+
+    pgmpy's VariableElimination prunes the network and searches a contraction path on every query.
+    Both only depend on which variables are queried and observed, not on the observed states, so they
+    are computed once per pattern and reused.
+    """
+    def __init__(self, model: DiscreteBayesianNetwork, max_plans: int = 4096):
+        """Initializes the inference engine.
+
+        Args:
+            model (DiscreteBayesianNetwork): Fitted bayesian network
+            max_plans (int, optional): Maximum number of cached query plans. Defaults to 4096.
+        """
+        super().__init__(model)
+        self.max_plans = max_plans
+        self.plans: OrderedDict[tuple[tuple[str, ...], frozenset[str]], QueryPlan] = OrderedDict()
+        self.plan_hits = 0
+        self.plan_misses = 0
+        self.lock = threading.Lock()
+
+
+    def query(self, variables: list[str], evidence: dict | None = None, virtual_evidence: list | None = None,
+              elimination_order: str | list = 'greedy', joint: bool = True, show_progress: bool = True) -> DiscreteFactor | dict:
+        """Returns the posterior distribution of the query variables (see VariableElimination.query).
+        Only joint queries with the default greedy elimination are planned, everything else is passed on.
+
+        Args:
+            variables (list[str]): Query variables
+            evidence (dict | None, optional): Evidence as node -> state name. Defaults to None.
+            virtual_evidence (list | None, optional): Virtual evidence. Defaults to None.
+            elimination_order (str | list, optional): Elimination order. Defaults to 'greedy'.
+            joint (bool, optional): If True: returns the joint distribution. Defaults to True.
+            show_progress (bool, optional): Progress bar of not planned queries. Defaults to True.
+
+        Returns:
+            DiscreteFactor | dict: Posterior distribution
+        """
+        evidence = evidence if evidence is not None else dict()
+        if virtual_evidence is not None or not joint or not isinstance(elimination_order, str) or elimination_order != 'greedy':
+            return super().query(variables, evidence, virtual_evidence, elimination_order, joint, show_progress)
+
+        common_vars = set(evidence).intersection(set(variables))
+        if common_vars:
+            raise ValueError(f"Can't have the same variables in both `variables` and `evidence`. Found in both: {common_vars}")
+
+        plan = self.get_plan(tuple(variables), frozenset(evidence))
+        einsum_expr = []
+        for factor, evidence_axes, indices in zip(plan.factors, plan.evidence_axes, plan.operand_indices):
+            indexer = [slice(None)] * len(factor.variables)
+            for axis, variable in evidence_axes:
+                indexer[axis] = factor.get_state_no(variable, evidence[variable])
+            einsum_expr.append(factor.values[tuple(indexer)])
+            einsum_expr.append(indices)
+        result_values = contract(*einsum_expr, plan.output_indices, optimize=plan.path)
+
+        result = DiscreteFactor(plan.variables, result_values.shape, result_values, state_names=plan.state_names)
+        return result.normalize(inplace=False)
+
+
+    def get_plan(self, variables: tuple[str, ...], evidence_variables: frozenset[str]) -> QueryPlan:
+        """Returns the (cached) query plan of a pattern.
+
+        Args:
+            variables (tuple[str, ...]): Query variables
+            evidence_variables (frozenset[str]): Evidence variables
+
+        Returns:
+            QueryPlan: Query plan
+        """
+        key = (variables, evidence_variables)
+        with self.lock:
+            plan = self.plans.get(key)
+            if plan is None:
+                self.plan_misses += 1
+            else:
+                self.plan_hits += 1
+                self.plans.move_to_end(key)
+        if plan is None:
+            plan = self._build_plan(list(variables), evidence_variables)
+            with self.lock:
+                self.plans[key] = plan
+                while len(self.plans) > self.max_plans:
+                    self.plans.popitem(last=False)
+        return plan
+
+
+    def _build_plan(self, variables: list[str], evidence_variables: frozenset[str]) -> QueryPlan:
+        """Prunes the network for a pattern and computes the contraction path, like VariableElimination.query.
+
+        Args:
+            variables (list[str]): Query variables
+            evidence_variables (frozenset[str]): Evidence variables
+
+        Returns:
+            QueryPlan: Query plan
+        """
+        # pruning only depends on the evidence variables, not on their states
+        model_reduced, evidence = self._prune_bayesian_model(variables, {variable: None for variable in evidence_variables})
+        relevant_evidence = set(evidence)
+        var_int_map = {var: i for i, var in enumerate(model_reduced.nodes())}
+
+        factors = []
+        operand_indices = []
+        shapes = []
+        for phi in model_reduced.cpds:
+            if len(set(phi.variables) - relevant_evidence) == 0:
+                continue
+            factors.append(phi)
+            operand_indices.append([var_int_map[var] for var in phi.variables if var not in relevant_evidence])
+            shapes.append(tuple(card for var, card in zip(phi.variables, phi.cardinality) if var not in relevant_evidence))
+        output_indices = [var_int_map[var] for var in variables]
+
+        einsum_expr = []
+        for shape, indices in zip(shapes, operand_indices):
+            # the path only depends on the shapes, a zero-strided view avoids allocating the factors
+            einsum_expr.append(np.broadcast_to(0.0, shape))
+            einsum_expr.append(indices)
+        path, _ = contract_path(*einsum_expr, output_indices, optimize='greedy')
+        state_names = {var: model_reduced.states[var] for var in variables}
+        return QueryPlan(factors, relevant_evidence, variables, path, operand_indices, output_indices, state_names)
+
+
+    def get_stats(self) -> dict[str, int | float]:
+        """Returns the plan cache statistics.
+
+        Returns:
+            dict[str, int | float]: Number of cached plans, plan hits, plan misses and hit rate
+        """
+        with self.lock:
+            requests = self.plan_hits + self.plan_misses
+            return {
+                'plans': len(self.plans),
+                'hits': self.plan_hits,
+                'misses': self.plan_misses,
+                'hit_rate': self.plan_hits / requests if requests else 0.0,
+            }
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+import threading
+from .model_view import ModelView
+
+
+class RelevantNetwork:
+    """Minimal sub-network of one (query variables, evidence variables) pattern.
+    """
+    def __init__(self, factor_nodes: frozenset[str], evidence_nodes: frozenset[str], connected_nodes: frozenset[str]):
+        """Initializes the sub-network.
+
+        Args:
+            factor_nodes (frozenset[str]): Nodes whose CPDs are needed to answer the query
+            evidence_nodes (frozenset[str]): Evidence nodes which influence the query
+            connected_nodes (frozenset[str]): Unobserved nodes which are d-connected to the query variables
+        """
+        self.factor_nodes = factor_nodes
+        self.evidence_nodes = evidence_nodes
+        self.connected_nodes = connected_nodes
+
+
+class RelevanceReducer:
+    """Computes and caches the minimal sub-network which is needed for a query.
+
+    Nodes which are barren (neither ancestors of the query nor of the evidence) or d-separated from
+    the query variables given the evidence do not change the result. The requisite CPDs and evidence
+    are found with the Bayes-Ball algorithm (Shachter, 1998), which covers the ancestral closure and
+    the d-separation test in one graph traversal.
+    """
+    def __init__(self, view: ModelView, max_networks: int = 4096):
+        """Initializes the reducer.
+
+        Args:
+            view (ModelView): View of the bayesian network
+            max_networks (int, optional): Maximum number of cached sub-networks. Defaults to 4096.
+        """
+        self.parents = view.parents
+        self.children = view.children
+        self.max_networks = max_networks
+        self.networks: OrderedDict[tuple[tuple[str, ...], frozenset[str]], RelevantNetwork] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+
+    def get_relevant_network(self, variables: tuple[str, ...], evidence_variables: frozenset[str]) -> RelevantNetwork:
+        """Returns the (cached) minimal sub-network of a query pattern.
+
+        Args:
+            variables (tuple[str, ...]): Query variables
+            evidence_variables (frozenset[str]): Evidence variables
+
+        Returns:
+            RelevantNetwork: Minimal sub-network
+        """
+        key = (variables, evidence_variables)
+        with self.lock:
+            network = self.networks.get(key)
+            if network is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.networks.move_to_end(key)
+        if network is None:
+            network = self._bayes_ball(variables, evidence_variables)
+            with self.lock:
+                self.networks[key] = network
+                while len(self.networks) > self.max_networks:
+                    self.networks.popitem(last=False)
+        return network
+
+
+    def reduce_evidence(self, variables: list[str], evidence: dict) -> dict:
+        """Removes all evidence which does not influence the query variables.
+
+        Args:
+            variables (list[str]): Query variables
+            evidence (dict): Evidence as node -> state name
+
+        Returns:
+            dict: Relevant evidence
+        """
+        network = self.get_relevant_network(tuple(variables), frozenset(evidence))
+        return {node: state for node, state in evidence.items() if node in network.evidence_nodes}
+
+
+    def _bayes_ball(self, variables: tuple[str, ...], evidence_variables: frozenset[str]) -> RelevantNetwork:
+        """Runs the Bayes-Ball algorithm, starting at the query variables as if visited from a child.
+
+        Args:
+            variables (tuple[str, ...]): Query variables
+            evidence_variables (frozenset[str]): Evidence variables
+
+        Returns:
+            RelevantNetwork: Minimal sub-network
+        """
+        top = set()
+        bottom = set()
+        visited = set()
+        schedule = [(variable, True) for variable in variables]
+        while schedule:
+            node, from_child = schedule.pop()
+            visited.add(node)
+            if node not in evidence_variables:
+                if from_child and node not in top:
+                    top.add(node)
+                    schedule.extend((parent, True) for parent in self.parents[node])
+                if node not in bottom:
+                    bottom.add(node)
+                    schedule.extend((child, False) for child in self.children[node])
+            elif not from_child and node not in top:
+                top.add(node)
+                schedule.extend((parent, True) for parent in self.parents[node])
+        return RelevantNetwork(frozenset(top), frozenset(visited & evidence_variables), frozenset(bottom - set(variables)))
+
+
+    def get_stats(self) -> dict[str, int | float]:
+        """Returns the sub-network cache statistics.
+
+        Returns:
+            dict[str, int | float]: Number of cached sub-networks, hits, misses, hit rate and the
+                average share of CPDs which are needed per cached sub-network
+        """
+        with self.lock:
+            requests = self.hits + self.misses
+            networks = list(self.networks.values())
+            return {
+                'networks': len(networks),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'mean_factor_share': (sum(len(network.factor_nodes) for network in networks)
+                                      / (len(networks) * len(self.parents)) if networks else 0.0),
+            }
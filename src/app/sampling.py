@@ -0,0 +1,157 @@
+import statistics
+import threading
+import time
+import numpy as np
+from .model_view import ModelView
+
+
+class SamplingResult:
+    """Posterior estimates of one likelihood weighting run.
+    """
+    def __init__(self, posteriors: dict[str, np.ndarray], lower: dict[str, np.ndarray], upper: dict[str, np.ndarray],
+                 joints: dict[str, np.ndarray], samples: int, effective_sample_size: float):
+        """Initializes the result.
+
+        Args:
+            posteriors (dict[str, np.ndarray]): Estimated posteriors (ordered like the state names) grouped by node
+            lower (dict[str, np.ndarray]): Lower confidence bounds of the posteriors grouped by node
+            upper (dict[str, np.ndarray]): Upper confidence bounds of the posteriors grouped by node
+            joints (dict[str, np.ndarray]): Estimated joint posteriors P(node, target | evidence)
+                (shape: node states x target states) grouped by node, empty without target node
+            samples (int): Number of drawn samples
+            effective_sample_size (float): Effective sample size of the weighted samples
+        """
+        self.posteriors = posteriors
+        self.lower = lower
+        self.upper = upper
+        self.joints = joints
+        self.samples = samples
+        self.effective_sample_size = effective_sample_size
+
+
+class LikelihoodWeighting:
+    """Approximate inference with likelihood weighted forward sampling, vectorized over batches of samples.
+
+    Unobserved nodes are sampled in topological order from their CPDs, observed nodes are fixed to
+    their evidence and weight the sample with their likelihood. Sampling stops after a sample or a
+    time budget, so the accuracy can be traded for latency.
+    """
+    def __init__(self, view: ModelView, batch_size: int = 10000, confidence: float = 0.95,
+                 seed: int | None = None):
+        """Prepares the CPDs of a model for sampling.
+
+        Args:
+            view (ModelView): View of the fitted bayesian network
+            batch_size (int, optional): Number of samples which are drawn at once. Defaults to 10000.
+            confidence (float, optional): Confidence level of the returned intervals. Defaults to 0.95.
+            seed (int | None, optional): Seed of the random number generators. Every query gets its own
+                generator (NumPy generators are not thread-safe), so seeded queries are reproducible in
+                the order they start. Defaults to None.
+        """
+        self.cardinality = view.cardinality
+        self.parents = view.parents
+        # topological order and ancestors of every node
+        self.nodes: list[str] = []
+        self.ancestors: dict[str, set[str]] = {}
+        remaining = list(view.nodes)
+        while remaining:
+            ready = [node for node in remaining if all(parent in self.ancestors for parent in self.parents[node])]
+            for node in ready:
+                self.ancestors[node] = set(self.parents[node]).union(*(self.ancestors[parent] for parent in self.parents[node]))
+                self.nodes.append(node)
+            remaining = [node for node in remaining if node not in self.ancestors]
+        # CPD values and cumulative distributions with the node as last axis (indexed by the parent states)
+        self.tables: dict[str, np.ndarray] = {}
+        self.cumulative: dict[str, np.ndarray] = {}
+        for node in self.nodes:
+            self.tables[node] = np.moveaxis(view.tables[node], 0, -1)
+            self.cumulative[node] = np.cumsum(self.tables[node], axis=-1)
+        self.batch_size = batch_size
+        self.z_score = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.seed_lock = threading.Lock()
+
+
+    def query(self, variables: list[str], evidence: dict[str, int], max_samples: int = 100000,
+              time_budget: float | None = None, target_node: str | None = None) -> SamplingResult:
+        """Estimates the posterior distributions of the query variables.
+
+        Args:
+            variables (list[str]): Query variables (unobserved)
+            evidence (dict[str, int]): Evidence as node -> state index
+            max_samples (int, optional): Sample budget. Defaults to 100000.
+            time_budget (float | None, optional): Time budget in seconds, at least one batch is drawn. Defaults to None.
+            target_node (str | None, optional): If given, the joint posteriors of every query variable
+                with this (unobserved) node are estimated, too. Defaults to None.
+
+        Returns:
+            SamplingResult: Posterior estimates
+        """
+        # barren nodes (no ancestor of a query variable or the evidence) do not need to be sampled
+        needed = set(variables) | set(evidence) | ({target_node} if target_node is not None else set())
+        needed |= set().union(*(self.ancestors[node] for node in needed))
+        order = [node for node in self.nodes if node in needed]
+
+        counts = {node: np.zeros(self.cardinality[node]) for node in variables}
+        joints = {}
+        if target_node is not None:
+            joints = {node: np.zeros((self.cardinality[node], self.cardinality[target_node]))
+                      for node in variables if node != target_node}
+        with self.seed_lock:
+            rng = np.random.default_rng(self.seed_sequence.spawn(1)[0])
+        samples = 0
+        weight_sum = 0.0
+        squared_weight_sum = 0.0
+        start_time = time.time()
+        while samples < max_samples:
+            size = min(self.batch_size, max_samples - samples)
+            sampled, weights = self.sample(order, evidence, size, rng)
+            for node in variables:
+                counts[node] += np.bincount(sampled[node], weights=weights, minlength=len(counts[node]))
+            for node, joint in joints.items():
+                cells = sampled[node] * joint.shape[1] + sampled[target_node]
+                joint += np.bincount(cells, weights=weights, minlength=joint.size).reshape(joint.shape)
+            samples += size
+            weight_sum += weights.sum()
+            squared_weight_sum += np.square(weights).sum()
+            if time_budget is not None and time.time() - start_time >= time_budget:
+                break
+
+        effective_sample_size = weight_sum**2 / squared_weight_sum if squared_weight_sum > 0 else 0.0
+        posteriors, lower, upper = {}, {}, {}
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for node, node_counts in counts.items():
+                posteriors[node] = node_counts / weight_sum
+                margin = self.z_score * np.sqrt(posteriors[node] * (1 - posteriors[node]) / effective_sample_size)
+                lower[node] = np.clip(posteriors[node] - margin, 0, 1)
+                upper[node] = np.clip(posteriors[node] + margin, 0, 1)
+            joints = {node: joint / weight_sum for node, joint in joints.items()}
+        return SamplingResult(posteriors, lower, upper, joints, samples, effective_sample_size)
+
+
+    def sample(self, order: list[str], evidence: dict[str, int], size: int,
+               rng: np.random.Generator) -> tuple[dict[str, np.ndarray], np.ndarray]:
+        """Draws one batch of likelihood weighted samples.
+
+        Args:
+            order (list[str]): Nodes to sample in topological order
+            evidence (dict[str, int]): Evidence as node -> state index
+            size (int): Number of samples
+            rng (np.random.Generator): Random number generator of the query
+
+        Returns:
+            tuple[dict[str, np.ndarray], np.ndarray]: Sampled state indices grouped by node and sample weights
+        """
+        sampled: dict[str, np.ndarray] = {}
+        weights = np.ones(size)
+        for node in order:
+            parent_states = tuple(sampled[parent] for parent in self.parents[node])
+            if node in evidence:
+                sampled[node] = np.full(size, evidence[node])
+                weights *= self.tables[node][parent_states + (sampled[node],)]
+                continue
+            cumulative = self.cumulative[node][parent_states]
+            states = (rng.random(size)[:, np.newaxis] > cumulative).sum(axis=1)
+            # rounding errors of the cumulative sums must not produce an invalid state
+            sampled[node] = np.minimum(states, cumulative.shape[-1] - 1)
+        return sampled, weights
@@ -0,0 +1,176 @@
+from collections import OrderedDict
+import copy
+import threading
+
+
+class SessionEvidence:
+    """Evidence of one session and the canonical evidence of the results the session already received.
+    """
+    def __init__(self):
+        """Initializes the empty state of a session.
+        """
+        # number of applied updates, the client sends the version its delta is based on
+        self.version = 0
+        self.cases: dict[str, dict[str, str]] = {}
+        # (case, model) or ('information_gain', model) -> canonical evidence of the delivered result
+        self.delivered: dict[tuple[str, str], tuple] = {}
+        self.lock = threading.Lock()
+
+
+class EvidenceStore:
+    """Session-scoped evidence on the server. Clients send the full evidence once and afterwards only
+    deltas (set or unset a feature of a case, add or remove a case). The store knows for which
+    evidence every (case, model) result and every information gain was delivered, so only the
+    invalidated ones are computed again.
+
+    The store lives in the memory of one process. A client whose session is unknown (e.g. evicted or
+    served by another process) has to send the full evidence again.
+    """
+    def __init__(self, model_manager, max_sessions: int = 1024):
+        """Initializes the store.
+
+        Args:
+            model_manager (ModelManager): Model manager which canonicalizes the evidence of every model
+            max_sessions (int, optional): Maximum number of stored sessions, the least recently used
+                session is removed. Defaults to 1024.
+        """
+        self.model_manager = model_manager
+        self.max_sessions = max_sessions
+        self.sessions: OrderedDict[str, SessionEvidence] = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def get(self, session_id: str) -> SessionEvidence | None:
+        """Returns the state of a session and marks it as recently used.
+
+        Args:
+            session_id (str): Session id
+
+        Returns:
+            SessionEvidence | None: State of the session, None if it is unknown
+        """
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is not None:
+                self.sessions.move_to_end(session_id)
+            return state
+
+
+    def set_evidence(self, session_id: str, evidence: dict[str, dict]) -> tuple[dict[str, dict], int]:
+        """Replaces the evidence of a session (the delivered results are kept).
+
+        Args:
+            session_id (str): Session id
+            evidence (dict[str, dict]): Evidence grouped by case
+
+        Returns:
+            tuple[dict[str, dict], int]: Copy of the evidence grouped by case and the new version
+        """
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is None:
+                state = self.sessions[session_id] = SessionEvidence()
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        with state.lock:
+            state.cases = copy.deepcopy(evidence)
+            state.version += 1
+            return copy.deepcopy(state.cases), state.version
+
+
+    def apply_delta(self, session_id: str, version: int, delta: list[dict]) -> tuple[dict[str, dict], int] | None:
+        """Applies a delta to the evidence of a session. Every change is one of
+        {'case', 'feature', 'value'} (sets a feature, a value of None unsets it), {'case'} (adds an
+        empty case) and {'case', 'remove': True} (removes a case).
+
+        Args:
+            session_id (str): Session id
+            version (int): Version of the evidence the delta is based on
+            delta (list[dict]): Changes
+
+        Raises:
+            ValueError: If a change is invalid
+
+        Returns:
+            tuple[dict[str, dict], int] | None: Copy of the evidence grouped by case and the new version,
+                None if the session is unknown or its version differs (the client has to send the full evidence)
+        """
+        state = self.get(session_id)
+        if state is None:
+            return None
+        with state.lock:
+            if state.version != version:
+                return None
+            cases = copy.deepcopy(state.cases)
+            for change in delta:
+                case = change.get('case')
+                if not isinstance(case, str):
+                    raise ValueError(f'Invalid evidence change {change}: "case" is missing')
+                if change.get('remove'):
+                    cases.pop(case, None)
+                    state.delivered = {key: value for key, value in state.delivered.items() if key[0] != case}
+                    continue
+                case_evidence = cases.setdefault(case, {})
+                if 'feature' not in change:
+                    continue
+                if change.get('value') is None:
+                    case_evidence.pop(change['feature'], None)
+                else:
+                    case_evidence[change['feature']] = str(change['value'])
+            state.cases = cases
+            state.version += 1
+            return copy.deepcopy(state.cases), state.version
+
+
+    def get_evidence_keys(self, evidence: dict[str, dict], model_evidence: dict[str, dict]) -> dict[tuple[str, str], tuple]:
+        """Returns the canonical evidence of every (case, model) result and of the information gain
+        (of 'case0') of every model.
+
+        Args:
+            evidence (dict[str, dict]): Evidence grouped by case
+            model_evidence (dict[str, dict]): Evidence (grouped by case) which replaces the evidence for single models
+
+        Returns:
+            dict[tuple[str, str], tuple]: Canonical evidence grouped by (case, model) and ('information_gain', model)
+        """
+        evidence_keys = {}
+        for model in self.model_manager.models:
+            model_name = model.get_name()
+            for case, case_evidence in model_evidence.get(model_name, evidence).items():
+                evidence_keys[(case, model_name)] = self.model_manager.get_evidence_key(model_name, case_evidence)
+                if case == 'case0':
+                    evidence_keys[('information_gain', model_name)] = evidence_keys[(case, model_name)]
+        return evidence_keys
+
+
+    def get_invalidated(self, session_id: str, evidence_keys: dict[tuple[str, str], tuple]) -> dict[tuple[str, str], tuple]:
+        """Returns the results whose canonical evidence differs from the evidence of the delivered results.
+
+        Args:
+            session_id (str): Session id
+            evidence_keys (dict[tuple[str, str], tuple]): Canonical evidence of the results (see get_evidence_keys)
+
+        Returns:
+            dict[tuple[str, str], tuple]: Canonical evidence of the invalidated results
+        """
+        state = self.get(session_id)
+        if state is None:
+            return dict(evidence_keys)
+        with state.lock:
+            return {key: evidence_key for key, evidence_key in evidence_keys.items()
+                    if state.delivered.get(key) != evidence_key}
+
+
+    def mark_delivered(self, session_id: str, key: tuple[str, str], evidence_key: tuple) -> None:
+        """Remembers the canonical evidence of a result which was sent to the session.
+
+        Args:
+            session_id (str): Session id
+            key (tuple[str, str]): (case, model) or ('information_gain', model)
+            evidence_key (tuple): Canonical evidence of the result (see get_evidence_keys)
+        """
+        state = self.get(session_id)
+        if state is not None:
+            with state.lock:
+                state.delivered[key] = evidence_key
@@ -72,7 +72,8 @@ class Interaction {
      */
     render_graphs(new_inferred_data) {
         Object.keys(new_inferred_data).forEach(key => {
-            this.inferred_data[key] = structuredClone(new_inferred_data[key])
+            // streamed results of single models are merged into the results of their case
+            this.inferred_data[key] = Object.assign(this.inferred_data[key] || {}, structuredClone(new_inferred_data[key]))
         })
         
         for (let i = 0; i < this.donut_graphs.length; i++) {
@@ -115,6 +116,10 @@ class Interaction {
         let model_key = this.donut_graphs[graph_index]['model_key']
         let feature_key = this.donut_graphs[graph_index]['feature_key']
         for (const case_key of case_keys) {
+            if (data[case_key][model_key] == undefined) {
+                // the result of this model is still being streamed
+                continue
+            }
             if (data[case_key][model_key][feature_key] == undefined) {
                 graph_data.push({'title': feature_key, 'case': case_key, 'category': 'Selected', 'value': 1, 'model_key': model_key})
                 continue                
@@ -455,7 +460,17 @@ class Interaction {
 }
 
 
-var interaction = new Interaction('ADNI')
+// the page stays inert (see base.html) until the networks are loaded and interaction exists
+var interaction
+load_networks(network_models).then(() => {
+    interaction = new Interaction('ADNI')
+    document.body.inert = false
+}).catch(error => {
+    console.error("Network Error:", error)
+    document.getElementById('load_error').hidden = false
+}).finally(() => {
+    document.body.removeAttribute('aria-busy')
+})
 
 function clean_id(str) {
     return str
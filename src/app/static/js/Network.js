@@ -1,4 +1,25 @@
 var globalColaLayout
+// network structures grouped by model name, loaded with load_networks()
+var network = {}
+
+
+/**
+ * Loads the structures of the bayesian networks. The browser revalidates its cached copies with
+ * their ETags, so unchanged structures are not transferred again.
+ *
+ * @param {list} model_names - Model names
+ * @returns {Promise} - Resolves when all structures are loaded
+ */
+function load_networks(model_names) {
+    return Promise.all(model_names.map(model_name =>
+        fetch('/api/network/' + encodeURIComponent(model_name), {cache: 'no-cache'})
+            .then(response => {
+                if (!response.ok) { throw new Error('Network ' + model_name + ': ' + response.status) }
+                return response.json()
+            })
+            .then(data => { network[model_name] = data })
+    ))
+}
 
 function draw_network(model_name) {
     var svg = document.getElementById('bayesian_network')
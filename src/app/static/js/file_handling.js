@@ -36,7 +36,7 @@ function add_new_patient (import_patient_data = false) {
     document.getElementById('patient_name').textContent = 'N/A, N/A'
     document.getElementById('patient_id').textContent = 'N/A'
     document.getElementById('patient_bday').textContent = 'N/A'
-    old_evidence = null
+    sent_evidence = null
     interaction = new Interaction('ADNI', import_patient_data)
     document.getElementById('settings_modal').close()
 }
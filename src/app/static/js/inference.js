@@ -1,53 +1,235 @@
 
+// evidence which was sent last and the version of the evidence stored on the server (null: the full evidence is sent)
+var sent_evidence = null
+var evidence_version = null
+var evidence_requests = 0
+
+
 /**
  * Gathers all selected criteria as evidence (ordered by what-if-case) and sends them
- * as ajax request to the server. After receiving a successful response, it initiates
- * the rendering of the graphs.
+ * as ajax request to the server. Only the changes since the last request are sent, the server
+ * keeps the evidence of the session and only computes the invalidated results. The results are
+ * streamed, every (case, model) result is rendered as soon as it arrives. The information gain
+ * is computed in a background job on the server.
+ *
+ * @returns {Promise} - Resolves when all results are received
  */
 function inference(case_list, replace_evidence=false, model=false) {
     let infer_btn = document.getElementById('infer_btn')
     infer_btn.ariaBusy = true
     infer_btn.disabled = true
 
-    var evidence = get_evidence(case_list, replace_evidence)
+    var evidence = get_evidence(case_list)
     console.log(evidence)
 
-    var url = '/ajax'
+    var url = '/ajax/stream'
 
     if (model) {
         url += '/' + model
     } else {replace_evidence = false}
-    var data = {'evidence': evidence, 'replace_evidence': replace_evidence}
+    var data = {'replace_evidence': replace_evidence, 'format': 'compact', 'information_gain': 'job'}
+    if (sent_evidence == null || evidence_version == null) {
+        data['evidence'] = evidence
+        evidence_version = null
+    } else {
+        data['delta'] = get_evidence_delta(sent_evidence, evidence)
+        data['evidence_version'] = evidence_version
+        evidence_version += 1
+    }
+    sent_evidence = evidence
+    let request_number = ++evidence_requests
 
     console.log(model)
     console.log(url)
-    $.ajax({
-        url: url,
+    var states = {}
+    var pending_results = {}
+    var render_scheduled = false
+
+    function render_pending_results() {
+        render_scheduled = false
+        let results = decode_results({'format': 'compact', 'states': states, 'results': pending_results})
+        pending_results = {}
+        interaction.render_graphs(results)
+    }
+
+    function handle_event(event) {
+        if (event['type'] == 'states') {
+            states = event['states']
+        } else if (event['type'] == 'information_gain_job') {
+            poll_information_gain(event['job_id'], 0, {'evidence': evidence, 'replace_evidence': replace_evidence}, model)
+        } else if (event['type'] == 'result') {
+            if (pending_results[event['case']] == undefined) {
+                pending_results[event['case']] = {}
+            }
+            pending_results[event['case']][event['model']] = event['result']
+            // results which arrive within one frame are rendered together
+            if (!render_scheduled) {
+                render_scheduled = true
+                requestAnimationFrame(render_pending_results)
+            }
+        } else if (event['type'] == 'information_gain') {
+            interaction.ig_data[event['model']] = event['information_gain']
+            update_network_ig()
+        } else if (event['type'] == 'error') {
+            console.error("Inference Error:", event['message'])
+        }
+    }
+
+    return fetch(url, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(data)
+    }).then(async response => {
+        if (response.status == 409) {
+            // the server does not know the evidence of this session (anymore), it is sent completely
+            sent_evidence = null
+            return inference(case_list, replace_evidence, model)
+        }
+        if (!response.ok) {
+            throw new Error('Status Code: ' + response.status)
+        }
+        if (request_number == evidence_requests) {
+            evidence_version = Number(response.headers.get('X-Evidence-Version'))
+        }
+        // newline delimited JSON, the last line may be incomplete
+        const reader = response.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ''
+        while (true) {
+            const {value, done} = await reader.read()
+            if (done) {
+                break
+            }
+            buffer += decoder.decode(value, {stream: true})
+            let lines = buffer.split('\n')
+            buffer = lines.pop()
+            lines.filter(line => line).forEach(line => handle_event(JSON.parse(line)))
+        }
+    }).catch(error => {
+        console.error("Stream Error:", error)
+        sent_evidence = null
+    }).finally(() => {
+        infer_btn.ariaBusy = false
+        infer_btn.disabled = false
+    })
+}
+
+// the newest information gain job, older jobs are cancelled by the server and not polled anymore
+var information_gain_job = null
+const INFORMATION_GAIN_POLL_INTERVAL = 200
+
+
+/**
+ * Polls an information gain job until it is finished and shows the information gain of every
+ * model as soon as it is available. Jobs live in the memory of the server worker which started
+ * them, if the poll reaches another worker (status 404), the information gain is requested inline.
+ *
+ * @param {string} job_id - Job id
+ * @param {number} shown_models - Number of models whose information gain is already shown
+ * @param {dict} request_data - Full evidence and replaced evidence of the request which started the job
+ * @param {string|boolean} model - Model of the replaced evidence
+ */
+function poll_information_gain(job_id, shown_models, request_data, model) {
+    information_gain_job = job_id
+    fetch('/ajax/information_gain/jobs/' + job_id).then(response => {
+        if (response.status == 404) {
+            load_information_gain(job_id, request_data, model)
+            return null
+        }
+        if (!response.ok) {
+            throw new Error('Status Code: ' + response.status)
+        }
+        return response.json()
+    }).then(job => {
+        if (job == null || information_gain_job != job_id) {
+            return
+        }
+        let models = Object.keys(job['information_gain'])
+        if (models.length > shown_models) {
+            models.forEach(model_key => { interaction.ig_data[model_key] = job['information_gain'][model_key] })
+            update_network_ig()
+        }
+        if (job['status'] == 'queued' || job['status'] == 'running') {
+            setTimeout(() => poll_information_gain(job_id, models.length, request_data, model), INFORMATION_GAIN_POLL_INTERVAL)
+        } else if (job['status'] == 'failed') {
+            console.error("Information Gain Error:", job['error'])
+        }
+    }).catch(error => {
+        console.error("Information Gain Error:", error)
+    })
+}
+
+
+/**
+ * Requests the information gain of a job which the server does not know directly.
+ *
+ * @param {string} job_id - Job id, the result is ignored if a newer job was started meanwhile
+ * @param {dict} request_data - Full evidence and replaced evidence of the request which started the job
+ * @param {string|boolean} model - Model of the replaced evidence
+ */
+function load_information_gain(job_id, request_data, model) {
+    let url = '/ajax/information_gain' + (model ? '/' + model : '')
+    fetch(url, {
         method: 'POST',
-        contentType: 'application/json',
-        data: JSON.stringify(data),
-        success: function(result){
-            console.log('Results')
-            console.log(result)
-            if (result['information_gain'] && Object.keys(result['information_gain']).length > 0){
-                interaction.ig_data = result['information_gain']
-                update_network_ig()
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({...request_data, 'information_gain': 'inline'})
+    }).then(response => {
+        if (!response.ok) {
+            throw new Error('Status Code: ' + response.status)
+        }
+        return response.json()
+    }).then(result => {
+        if (information_gain_job != job_id) {
+            return
+        }
+        Object.keys(result['information_gain']).forEach(model_key => {
+            interaction.ig_data[model_key] = result['information_gain'][model_key]
+        })
+        update_network_ig()
+    }).catch(error => {
+        console.error("Information Gain Error:", error)
+    })
+}
+
+
+/**
+ * Converts the results of the compact response format (permille values in state order, observed nodes
+ * as state index) to the results grouped by case, model, node and state (in percent).
+ *
+ * @param {dict} result - Server response
+ * @returns {dict} - Inference results
+ */
+function decode_results(result) {
+    if (result['format'] != 'compact') {
+        return result['results']
+    }
+    var results = {}
+    for (const [case_key, models] of Object.entries(result['results'])) {
+        results[case_key] = {}
+        for (const [model_key, nodes] of Object.entries(models)) {
+            results[case_key][model_key] = {}
+            for (const [node, values] of Object.entries(nodes)) {
+                let states = result['states'][model_key][node]
+                let probabilities = {}
+                if (Array.isArray(values)) {
+                    states.forEach((state, i) => { probabilities[state] = values[i] / 10 })
+                } else {
+                    probabilities[states[values]] = 100
+                }
+                results[case_key][model_key][node] = probabilities
             }
-            interaction.render_graphs(result['results'])
-        },
-        error: function(xhr, status, error) {
-            console.error("AJAX Error:", status, error);
-            console.log("Response Text:", xhr.responseText);
-            console.log("Status Code:", xhr.status);
-        },
-        complete: function () {
-            infer_btn.ariaBusy = false
-            infer_btn.disabled = false
-        }
-    });
+        }
+    }
+    return results
 }
 
-function get_evidence(case_list, replace_evidence = false) {
+/**
+ * Gathers the selected criteria of all cases.
+ *
+ * @param {list} case_list - Case ids
+ * @returns {dict} - Evidence grouped by case and feature
+ */
+function get_evidence(case_list) {
 
     var selected_criteria = document.querySelectorAll('.criteria-item:not(.empty)');
     var data = {}
@@ -64,29 +246,42 @@ function get_evidence(case_list, replace_evidence = false) {
         
     })
 
-
     console.log(data)
-    let cases_to_ignore = []
-    Object.keys(data).forEach(key => {
-        if (old_evidence != null && JSON.stringify(data[key]) == old_evidence[key] && !replace_evidence && !replaced_evidence_last_time) {
-            cases_to_ignore.push(key)
-        } else {
-            if (old_evidence == null) {old_evidence = {}}
-            old_evidence[key] = JSON.stringify(data[key])
-        }   
-    })
-    cases_to_ignore.forEach(key => {
-        delete data[key]
-    })
-    
-    if (replace_evidence) {
-        replaced_evidence_last_time = true
-    }
-
-
-    console.log('data')
     return data
 }
 
-var old_evidence = null
-var replaced_evidence_last_time = false
\ No newline at end of file
+
+/**
+ * Returns the changes between two evidence sets: set or unset features ('value' null) and added or
+ * removed cases.
+ *
+ * @param {dict} old_evidence - Evidence which was sent last, grouped by case and feature
+ * @param {dict} new_evidence - Current evidence, grouped by case and feature
+ * @returns {list} - Changes
+ */
+function get_evidence_delta(old_evidence, new_evidence) {
+    let delta = []
+    for (const [case_key, case_evidence] of Object.entries(new_evidence)) {
+        let old_case_evidence = old_evidence[case_key]
+        if (old_case_evidence == undefined) {
+            delta.push({'case': case_key})
+            old_case_evidence = {}
+        }
+        for (const [feature, value] of Object.entries(case_evidence)) {
+            if (old_case_evidence[feature] !== value) {
+                delta.push({'case': case_key, 'feature': feature, 'value': value})
+            }
+        }
+        for (const feature of Object.keys(old_case_evidence)) {
+            if (!(feature in case_evidence)) {
+                delta.push({'case': case_key, 'feature': feature, 'value': null})
+            }
+        }
+    }
+    for (const case_key of Object.keys(old_evidence)) {
+        if (!(case_key in new_evidence)) {
+            delta.push({'case': case_key, 'remove': true})
+        }
+    }
+    return delta
+}
@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+
+# memory fields of /proc/<pid>/smaps_rollup (in kB) and their names in the memory statistics
+MEMORY_FIELDS = {'Rss': 'rss', 'Pss': 'pss', 'Shared_Clean': 'shared', 'Shared_Dirty': 'shared',
+                 'Private_Clean': 'private', 'Private_Dirty': 'private'}
+
+
+# model of the current worker process, set once by the pool initializer
+_worker_model = None
+
+
+def _initialize_worker(model, pids) -> None:
+    """Registers the model of a worker process and reports the process id to the pool.
+
+    Args:
+        model (Model): Model, inherited from the parent process by fork
+        pids (multiprocessing.SimpleQueue): Queue of the process ids of the pool's workers
+    """
+    global _worker_model
+    _worker_model = model
+    pids.put(os.getpid())
+
+
+def _run_task(method: str, args: tuple):
+    """Runs a method of the worker's model.
+
+    Args:
+        method (str): Method name of Model
+        args (tuple): Method arguments
+
+    Returns:
+        any: Method result
+    """
+    return getattr(_worker_model, method)(*args)
+
+
+def get_memory_usage(pid: int | None = None) -> dict[str, int]:
+    """Returns the memory usage of a process. Pages of memory mapped files (like the CPD arrays) and
+    pages which are still shared with the parent process after fork count as shared memory.
+
+    Args:
+        pid (int | None, optional): Process id, None for the current process. Defaults to None.
+
+    Returns:
+        dict[str, int]: 'rss', 'pss' (shared pages split between their processes), 'shared' and
+            'private' memory in bytes, empty if the memory usage is not available (only on Linux)
+    """
+    usage = {}
+    try:
+        with open(f'/proc/{pid or "self"}/smaps_rollup', 'r', encoding='utf-8') as file:
+            for line in file:
+                field, _, value = line.partition(':')
+                if field in MEMORY_FIELDS:
+                    name = MEMORY_FIELDS[field]
+                    usage[name] = usage.get(name, 0) + int(value.split()[0]) * 1024
+    except OSError:
+        return {}
+    return usage
+
+
+def _ping() -> bool:
+    """Empty task, which is used to start the worker processes.
+
+    Returns:
+        bool: True
+    """
+    return True
+
+
+class WorkerPool:
+    """Long-lived worker processes per model.
+
+    The workers are forked once after the models have been loaded, so every worker already holds its
+    model and inference engine. Per task only the method name, the evidence and the result are pickled.
+    """
+    def __init__(self, models: list, workers_per_model: int = 1):
+        """Starts the worker processes of all models.
+
+        Args:
+            models (list[Model]): Loaded models
+            workers_per_model (int, optional): Number of worker processes per model. Defaults to 1.
+        """
+        context = multiprocessing.get_context('fork')
+        self.executors: dict[str, ProcessPoolExecutor] = {}
+        self.pid_queues: dict[str, multiprocessing.SimpleQueue] = {}
+        self.pids: dict[str, list[int]] = {}
+        for model in models:
+            self.pid_queues[model.get_name()] = context.SimpleQueue()
+            self.pids[model.get_name()] = []
+            self.executors[model.get_name()] = ProcessPoolExecutor(workers_per_model, mp_context=context,
+                                                                   initializer=_initialize_worker,
+                                                                   initargs=(model, self.pid_queues[model.get_name()]))
+        # fork all workers now (before the web server starts its threads) instead of on the first request
+        wait([executor.submit(_ping) for executor in self.executors.values()])
+
+
+    def submit(self, model_name: str, method: str, *args) -> Future:
+        """Submits a task to the workers of a model.
+
+        Args:
+            model_name (str): Model name
+            method (str): Method name of Model
+
+        Returns:
+            Future: Future of the method result
+        """
+        return self.executors[model_name].submit(_run_task, method, args)
+
+
+    def get_worker_pids(self, model_name: str) -> list[int]:
+        """Returns the process ids of the (started) workers of a model.
+
+        Args:
+            model_name (str): Model name
+
+        Returns:
+            list[int]: Process ids
+        """
+        while not self.pid_queues[model_name].empty():
+            self.pids[model_name].append(self.pid_queues[model_name].get())
+        return self.pids[model_name]
+
+
+    def get_memory_stats(self) -> dict[str, list[dict[str, int]]]:
+        """Returns the memory usage of every worker.
+
+        Returns:
+            dict[str, list[dict[str, int]]]: Process id and memory usage (see get_memory_usage) of
+                every worker grouped by model name
+        """
+        return {model_name: [{'pid': pid, **get_memory_usage(pid)} for pid in self.get_worker_pids(model_name)]
+                for model_name in self.executors}
+
+
+    def shutdown(self) -> None:
+        """Stops all worker processes.
+        """
+        for executor in self.executors.values():
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,16 @@
+"""Production entry point of the app, e.g. for gunicorn (see gunicorn.conf.py):
+
+    gunicorn --config app/gunicorn.conf.py app.wsgi:app
+
+The models are loaded and warmed up once on import. With gunicorn's 'preload_app' this happens in the
+master process before the workers are forked, so all workers share the loaded models copy-on-write
+and are ready when they accept their first request.
+"""
+from . import create_app, model_manager
+
+if model_manager.execution_mode == 'worker_pool':
+    # forked web workers would inherit the worker pool's executors without their management threads
+    raise RuntimeError('The execution mode "worker_pool" can not be used with a prefork server, use "sequential"')
+
+model_manager.warmup()
+app = create_app()
@@ -1,5 +1,4 @@
 import pandas as pd
-import numpy as np
 from model_building.ModelBuilder import ModelBuilder
 from clean_up_data.ADNICleaner import ADNICleaner
 from clean_up_data.DELCODECleaner import DELCODECleaner
@@ -66,18 +65,9 @@ def test_model(name: str, config_path: str, test_data_path: str,
     if 'prmdiag' in mapped_cols_nodes.keys():
         del mapped_cols_nodes['prmdiag']
 
-    y_true = []
-    y_pred = []
-    y_score = []
-    for index, row in test_data.iterrows():
-        evidence = row.loc[mapped_cols_nodes.values()].dropna().to_dict()
-        y_true.append(row['Diagnose'])
-        prediction = model.get_inference(evidence, target_node='Diagnose')
-        max_index = np.argmax(prediction.values)
-        y_pred.append(prediction.state_names['Diagnose'][max_index])
-
-        y_score.append({key: value for key, value in zip(prediction.state_names['Diagnose'], prediction.values)})
-    y_score_df = pd.DataFrame(y_score)
+    y_true = test_data['Diagnose'].tolist()
+    y_score_df = model.infer_batch(test_data[list(mapped_cols_nodes.values())], target='Diagnose')
+    y_pred = y_score_df.idxmax(axis=1).tolist()
     y_score_df = y_score_df.reindex(sorted(y_score_df.columns), axis=1)
     print(f'Model: {name}')
     print(f'accuracy score: {accuracy_score(y_true, y_pred)}')
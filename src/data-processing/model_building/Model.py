@@ -1,4 +1,5 @@
 import joblib
+from opt_einsum import contract
 from pgmpy.inference import VariableElimination
 from pgmpy.models import DiscreteBayesianNetwork
 import pandas as pd
@@ -6,6 +7,7 @@ import json
 import numpy as np
 from scipy.stats import entropy
 import math
+from model_building.IntervalIndex import IntervalIndex
 
 
 class Model:
@@ -23,6 +25,7 @@ class Model:
         self.model: DiscreteBayesianNetwork = joblib.load(path)
         self.infer = VariableElimination(self.model)
         self.intervals = {}
+        self.interval_indexes: dict[str, IntervalIndex] = {}
         self.load_all_intervals()
 
 
@@ -58,10 +61,21 @@ class Model:
         Returns:
             str|None: Returns the pandas.Interval as string. If no interval fits it returns None
         """
-        for interval in self.intervals[node]:
-            if value in interval:
-                return str(interval)
-        return None
+        return self.interval_indexes[node].convert(value)
+
+
+    def convert_numeric_values_to_intervals(self, node: str, values: np.ndarray) -> np.ndarray:
+        """Converts numeric values to the associated intervals (vectorized variant of
+        convert_numeric_value_to_interval).
+
+        Args:
+            node (str): Node with intervals
+            values (np.ndarray): Numbers which should be converted (NaN for missing values)
+
+        Returns:
+            np.ndarray: The pandas.Intervals as strings, None where no interval fits
+        """
+        return self.interval_indexes[node].convert_array(values)
     # ToDo: add option for nearest interval    
     # if value <= self.intervals[node][0].left:
     #     return str(self.intervals[node][0])
@@ -78,6 +92,7 @@ class Model:
                 if '(' not in str(state_name) and '[' not in str(state_name):
                     break
                 self.intervals[node].append(string_to_pandas_interval(state_name))
+            self.interval_indexes[node] = IntervalIndex(self.intervals[node])
 
 
     def get_intervals(self) -> dict[str, list[pd.Interval]]:
@@ -111,7 +126,7 @@ class Model:
             if interval is None:
                 evidence_filtered.pop(node)
             else:
-                evidence_filtered[node] = self.convert_numeric_value_to_interval(node, float(evidence[node]))
+                evidence_filtered[node] = interval
 
         if target_node is not None:
             infer_nodes = [target_node]
@@ -141,6 +156,94 @@ class Model:
         return result.state_names['Diagnose'][max_index]   
 
 
+    def infer_batch(self, df: pd.DataFrame, target: str = 'Diagnose') -> pd.DataFrame:
+        """Returns the probabilities of the target node for many evidence rows at once. Rows are grouped
+        by their evidence pattern (the set of observed nodes) and every group is inferred with one
+        batched tensor contraction.
+
+        Args:
+            df (pd.DataFrame): Evidence rows, columns are node names and missing values are NaN
+            target (str, optional): Target node. Defaults to 'Diagnose'.
+
+        Returns:
+            pd.DataFrame: Probability matrix (rows of df x states of the target node)
+        """
+        evidence = self.discretize_evidence(df.drop(columns=target, errors='ignore'))
+        state_names = self.get_state_names(target)
+        probabilities = np.full((len(evidence), len(state_names)), np.nan)
+
+        observed = evidence.notna().to_numpy()
+        patterns, pattern_index = np.unique(observed, axis=0, return_inverse=True)
+        for index, pattern in enumerate(patterns):
+            rows = np.flatnonzero(pattern_index.ravel() == index)
+            evidence_nodes = list(evidence.columns[pattern])
+            probabilities[rows] = self._infer_pattern(evidence.iloc[rows][evidence_nodes], target)
+        return pd.DataFrame(probabilities, index=df.index, columns=state_names)
+
+
+    def discretize_evidence(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Keeps the columns which are nodes of the model and converts numeric values of interval nodes
+        to their interval (like get_inference). Values without a matching interval become NaN.
+
+        Args:
+            df (pd.DataFrame): Evidence rows
+
+        Returns:
+            pd.DataFrame: Evidence rows with state names
+        """
+        nodes = self.get_nodes()
+        evidence = df[[col for col in df.columns if col in nodes]].astype(object)
+        for node in evidence.columns:
+            if self.intervals[node] == []:
+                continue
+            column = evidence[node]
+            # missing values and values which are already intervals are kept
+            keep = (column.isna() | column.map(lambda value: isinstance(value, str) and ', ' in value)).to_numpy()
+            values = column.where(~keep, np.nan).astype(float).to_numpy()
+            evidence[node] = np.where(keep, column.to_numpy(), self.convert_numeric_values_to_intervals(node, values))
+        return evidence.where(evidence.notna(), np.nan)
+
+
+    def _infer_pattern(self, evidence: pd.DataFrame, target: str) -> np.ndarray:
+        """Infers the target node for rows which share the same evidence nodes. The network is pruned
+        once for the pattern and the evidence states of all rows are gathered into an additional batch
+        axis of the CPDs, so the whole group is one tensor contraction.
+
+        Args:
+            evidence (pd.DataFrame): Evidence rows without missing values
+            target (str): Target node
+
+        Returns:
+            np.ndarray: Probabilities (rows x states of the target node)
+        """
+        # private pgmpy API, pgmpy is pinned to 1.0.0 in the requirements of the data processing container
+        model_reduced, _ = self.infer._prune_bayesian_model([target], {node: None for node in evidence.columns})
+        evidence_nodes = [node for node in evidence.columns if node in model_reduced.nodes()]
+        if not evidence_nodes:
+            result = self.infer.query(variables=[target], show_progress=False)
+            return np.tile(result.values, (len(evidence), 1))
+
+        var_int_map = {var: i for i, var in enumerate(model_reduced.nodes())}
+        batch_index = len(var_int_map)
+        einsum_expr = []
+        for cpd in model_reduced.cpds:
+            observed = [var for var in cpd.variables if var in evidence_nodes]
+            if not observed:
+                einsum_expr.append(cpd.values)
+                einsum_expr.append([var_int_map[var] for var in cpd.variables])
+                continue
+            # move the observed axes to the front and gather the state of every row
+            axes = [cpd.variables.index(var) for var in observed]
+            values = np.moveaxis(cpd.values, axes, list(range(len(axes))))
+            states = tuple(np.array([cpd.get_state_no(var, state) for state in evidence[var]], dtype=int) for var in observed)
+            einsum_expr.append(values[states])
+            einsum_expr.append([batch_index] + [var_int_map[var] for var in cpd.variables if var not in evidence_nodes])
+
+        result = contract(*einsum_expr, [batch_index, var_int_map[target]], optimize='greedy')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return result / result.sum(axis=1, keepdims=True)
+
+
     def get_name(self) -> str:
         """Returns the name of the model.
 
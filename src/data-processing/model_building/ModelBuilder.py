@@ -5,6 +5,13 @@ from pgmpy.estimators import BayesianEstimator
 import pandas as pd
 import joblib
 import numpy as np
+import json
+import re
+
+# version of the model artifact format, must match ARTIFACT_FORMAT of the app (src/app/model_view.py)
+ARTIFACT_FORMAT = 1
+INTERVAL_PATTERN = re.compile(r'^([\[(])\s*(-?inf|[-+0-9.eE]+)\s*,\s*(-?inf|[-+0-9.eE]+)\s*([\])])$')
+INTERVAL_CLOSED = {('[', ']'): 'both', ('(', ')'): 'neither', ('[', ')'): 'left', ('(', ']'): 'right'}
 
 
 class ModelBuilder:
@@ -64,6 +71,7 @@ class ModelBuilder:
     def save_model(self) -> None:
         file_path, file_type = self.config_loader.get_save_path_and_file_type()
         joblib.dump(self.model, file_path)
+        save_model_artifact(self.model, file_path[:-len(file_type) - 1])
 
 
     def get_model(self) -> DiscreteBayesianNetwork:
@@ -74,4 +82,73 @@ class ModelBuilder:
         model_graphviz = self.model.to_graphviz()
         path, file_type = self.config_loader.get_save_plot_path().split('.')
         model_graphviz.draw(f'{path}_dot.{file_type}', prog="dot")
-        model_graphviz.draw(f'{path}_fdp.{file_type}', prog="fdp")
\ No newline at end of file
+        model_graphviz.draw(f'{path}_fdp.{file_type}', prog="fdp")
+
+
+def parse_interval(state_name: str) -> tuple[float, float, str] | None:
+    """Parses a interval state name like "(1.5, 2.0]".
+
+    Args:
+        state_name (str): State name
+
+    Returns:
+        tuple[float, float, str] | None: Interval as (left, right, closed), None if the state is no interval
+    """
+    match = INTERVAL_PATTERN.match(str(state_name).strip())
+    if match is None:
+        return None
+    left_bracket, left, right, right_bracket = match.groups()
+    return float(left), float(right), INTERVAL_CLOSED[(left_bracket, right_bracket)]
+
+
+def save_model_artifact(model: DiscreteBayesianNetwork, base_path: str) -> None:
+    """Saves a fitted model as model artifact for the app, which loads without unpickling:
+    a JSON header ('<base_path>.json') with nodes, edges, state names, parents, intervals and the
+    position of every CPD in a flat float64 array ('<base_path>.npy', memory mappable).
+    The axes of every CPD are (node, *parents) in the order of the state names.
+
+    Args:
+        model (DiscreteBayesianNetwork): Fitted bayesian network
+        base_path (str): Path of the artifact without file type
+    """
+    nodes = list(model.nodes())
+    state_names = {node: list(model.get_cpds(node).state_names[node]) for node in nodes}
+    parents = {}
+    intervals = {}
+    cpds = {}
+    arrays = []
+    offset = 0
+    for node in nodes:
+        cpd = model.get_cpds(node)
+        variables = list(cpd.variables)
+        values = cpd.get_values().reshape([len(state_names[variable]) for variable in variables])
+        # align the state order of every axis with the state order of the header
+        for axis, variable in enumerate(variables):
+            values = np.take(values, [cpd.state_names[variable].index(state) for state in state_names[variable]], axis=axis)
+        parents[node] = variables[1:]
+        cpds[node] = [offset, list(values.shape)]
+        arrays.append(values.ravel())
+        offset += values.size
+
+        # like the app, the interval states of a node end at the first state which is no interval
+        node_intervals = []
+        for state_name in state_names[node]:
+            interval = parse_interval(state_name)
+            if interval is None:
+                break
+            node_intervals.append(interval)
+        if node_intervals:
+            intervals[node] = node_intervals
+
+    np.save(f'{base_path}.npy', np.concatenate(arrays).astype(np.float64), allow_pickle=False)
+    header = {
+        'format': ARTIFACT_FORMAT,
+        'nodes': nodes,
+        'edges': [list(edge) for edge in model.edges()],
+        'states': state_names,
+        'parents': parents,
+        'intervals': intervals,
+        'cpds': cpds
+    }
+    with open(f'{base_path}.json', 'w', encoding='utf-8') as file:
+        json.dump(header, file, ensure_ascii=False)
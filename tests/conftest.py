@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the tests import the app package from src, models are only loaded when a test uses them
+os.environ.setdefault('PRELOAD_MODELS', '')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -0,0 +1,117 @@
+import functools
+import math
+import os
+
+import numpy as np
+import pytest
+from pgmpy.inference import VariableElimination
+from pgmpy.sampling import BayesianModelSampling
+from scipy.stats import entropy
+
+from app.junction_tree import JunctionTree
+from app.models import Model
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'src', 'app', 'models')
+MODEL_NAMES = ['ADNI', 'DELCODE']
+# exact engines, which must give the results of pgmpy's VariableElimination
+INFERENCE_MODES = ['variable_elimination', 'junction_tree', 'einsum']
+EVIDENCE_SETS = 4
+SEED = 42
+
+
+@functools.cache
+def load_model(model_name: str, inference_mode: str) -> Model:
+    return Model(model_name, os.path.join(MODEL_DIR, f'{model_name}.json'), inference_mode)
+
+
+@functools.cache
+def load_reference(model_name: str) -> VariableElimination:
+    return VariableElimination(load_model(model_name, 'variable_elimination').get_bayesian_network())
+
+
+@functools.cache
+def get_evidence_sets(model_name: str) -> list[dict[str, str]]:
+    """Random evidence sets with a positive probability: random subsets of forward samples."""
+    network = load_model(model_name, 'variable_elimination').get_bayesian_network()
+    samples = BayesianModelSampling(network).forward_sample(size=EVIDENCE_SETS, seed=SEED, show_progress=False)
+    rng = np.random.default_rng(SEED)
+    nodes = [node for node in network.nodes() if node != 'Diagnose']
+    evidence_sets = [{}]
+    for index, sample in samples.iterrows():
+        observed = rng.choice(nodes, size=min(2 + 2 * index, len(nodes)), replace=False)
+        evidence_sets.append({node: sample[node] for node in observed})
+    return evidence_sets
+
+
+def get_reference_posterior(model_name: str, evidence: dict[str, str], node: str) -> np.ndarray:
+    return load_reference(model_name).query([node], evidence=evidence, show_progress=False).values
+
+
+def get_reference_information_gain(model_name: str, evidence: dict[str, str], node: str, target_node: str = 'Diagnose') -> float:
+    """Information gain like Model.get_information_gain_of_node, computed with VariableElimination."""
+    if node in evidence:
+        return 0
+    state_names = load_model(model_name, 'variable_elimination').get_state_names(node)
+    expected_conditional_entropy = 0
+    for state_index, state_prob in enumerate(get_reference_posterior(model_name, evidence, node)):
+        if state_prob < 0.00001:
+            continue
+        posterior = get_reference_posterior(model_name, {**evidence, node: state_names[state_index]}, target_node)
+        expected_conditional_entropy += state_prob * entropy(posterior, base=2)
+    return entropy(get_reference_posterior(model_name, evidence, target_node), base=2) - expected_conditional_entropy
+
+
+def get_query_nodes(model_name: str, evidence: dict[str, str], count: int = 6) -> list[str]:
+    nodes = [node for node in load_model(model_name, 'variable_elimination').get_nodes() if node not in evidence]
+    rng = np.random.default_rng(len(evidence))
+    return ['Diagnose'] + [str(node) for node in rng.choice([node for node in nodes if node != 'Diagnose'], size=count, replace=False)]
+
+
+@pytest.mark.parametrize('evidence_index', range(EVIDENCE_SETS + 1))
+@pytest.mark.parametrize('inference_mode', INFERENCE_MODES)
+@pytest.mark.parametrize('model_name', MODEL_NAMES)
+def test_posteriors_match_variable_elimination(model_name, inference_mode, evidence_index):
+    model = load_model(model_name, inference_mode)
+    evidence = get_evidence_sets(model_name)[evidence_index]
+    nodes = get_query_nodes(model_name, evidence)
+    posteriors = model.get_posteriors(evidence, nodes)
+    for node in nodes:
+        assert np.allclose(posteriors[node], get_reference_posterior(model_name, evidence, node), atol=1e-12), node
+
+
+@pytest.mark.parametrize('evidence_index', range(EVIDENCE_SETS + 1))
+@pytest.mark.parametrize('inference_mode', INFERENCE_MODES)
+def test_information_gain_matches_variable_elimination(inference_mode, evidence_index):
+    model = load_model('ADNI', inference_mode)
+    evidence = get_evidence_sets('ADNI')[evidence_index]
+    information_gain = model.get_information_gain_of_all_nodes(evidence)
+    nodes = get_query_nodes('ADNI', evidence)[1:]
+    reference = [get_reference_information_gain('ADNI', evidence, node) for node in nodes]
+    assert np.allclose([information_gain[node] for node in nodes], reference, atol=1e-9)
+    assert all(math.isfinite(value) for value in information_gain.values())
+
+
+@pytest.mark.parametrize('model_name', MODEL_NAMES)
+def test_junction_tree_update_matches_calibration(model_name):
+    model = load_model(model_name, 'junction_tree')
+    junction_tree = JunctionTree(model.view)
+    evidence_sets = [model.view.encode_evidence(evidence) for evidence in get_evidence_sets(model_name)]
+    calibration = junction_tree.calibrate({})
+    current = {}
+    for evidence in evidence_sets[1:]:
+        # one added, changed or removed node per step, like the incremental updates of a session
+        steps = []
+        step = current
+        for node, code in evidence.items():
+            step = {**step, node: code}
+            steps.append(step)
+        for node in [node for node in current if node not in evidence]:
+            step = {key: value for key, value in step.items() if key != node}
+            steps.append(step)
+        assert step == evidence
+        for step in steps:
+            calibration = junction_tree.update(calibration, step)
+            expected = junction_tree.calibrate(step).get_marginals()
+            for node, marginal in calibration.get_marginals().items():
+                assert np.allclose(marginal, expected[node], atol=1e-12), node
+        current = evidence
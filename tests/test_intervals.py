@@ -0,0 +1,30 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.intervals import IntervalIndex
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+
+def test_copies_are_identical():
+    with open(os.path.join(SRC_DIR, 'app', 'intervals.py'), 'rb') as file:
+        app_copy = file.read()
+    with open(os.path.join(SRC_DIR, 'data-processing', 'model_building', 'IntervalIndex.py'), 'rb') as file:
+        data_processing_copy = file.read()
+    assert app_copy == data_processing_copy
+
+
+def test_convert():
+    index = IntervalIndex([pd.Interval(26.0, np.inf, 'right'), pd.Interval(19.0, 26.0, 'right'), pd.Interval(-np.inf, 19.0, 'right')])
+    assert index.convert(16) == str(pd.Interval(-np.inf, 19.0, 'right'))
+    assert index.convert(19) == str(pd.Interval(-np.inf, 19.0, 'right'))
+    assert index.convert(19.5) == str(pd.Interval(19.0, 26.0, 'right'))
+    assert list(index.convert_array(np.array([16.0, 30.0]))) == [str(pd.Interval(-np.inf, 19.0, 'right')), str(pd.Interval(26.0, np.inf, 'right'))]
+
+
+def test_convert_outside_of_intervals():
+    index = IntervalIndex([pd.Interval(0.0, 10.0, 'left'), pd.Interval(10.0, 20.0, 'left')])
+    assert index.convert(20.0) is None
+    assert index.convert(-1.0) is None
@@ -0,0 +1,42 @@
+from app.models import ModelManager
+from app.sessions import EvidenceStore
+
+
+def create_store() -> tuple[ModelManager, EvidenceStore]:
+    model_manager = ModelManager({'ADNI': 'ADNI', 'DELCODE': 'DELCODE'}, inference_mode='junction_tree', max_loaded_models=1)
+    return model_manager, EvidenceStore(model_manager)
+
+
+def deliver_all(store: EvidenceStore, session_id: str, evidence: dict[str, dict]) -> None:
+    for key, evidence_key in store.get_evidence_keys(evidence, {}).items():
+        store.mark_delivered(session_id, key, evidence_key)
+
+
+def test_delta_invalidates_only_changed_models():
+    model_manager, store = create_store()
+    evidence, version = store.set_evidence('session', {'case0': {'Alkoholkonsum': 'Ja', 'MMSE': '16'}, 'case1': {}})
+    deliver_all(store, 'session', evidence)
+    # Alkoholkonsum is only a node of DELCODE, both MMSE values are in the same interval of both models
+    evidence, version = store.apply_delta('session', version, [
+        {'case': 'case0', 'feature': 'Alkoholkonsum', 'value': 'Nein'},
+        {'case': 'case0', 'feature': 'MMSE', 'value': 17},
+    ])
+    invalidated = store.get_invalidated('session', store.get_evidence_keys(evidence, {}))
+    assert sorted(invalidated) == [('case0', 'DELCODE'), ('information_gain', 'DELCODE')]
+
+
+def test_evidence_keys_do_not_load_models():
+    model_manager, store = create_store()
+    evidence, version = store.set_evidence('session', {'case0': {'MMSE': '16'}, 'case1': {'Alter': '80'}})
+    deliver_all(store, 'session', evidence)
+    evidence, version = store.apply_delta('session', version, [{'case': 'case0', 'feature': 'MMSE', 'value': 18}])
+    assert store.get_invalidated('session', store.get_evidence_keys(evidence, {})) == {}
+    assert model_manager.model_pool.get_stats()['loads'] == 0
+    assert model_manager.model_pool.get_loaded() == []
+
+
+def test_outdated_version_requires_full_evidence():
+    _, store = create_store()
+    _, version = store.set_evidence('session', {'case0': {}})
+    assert store.apply_delta('session', version - 1, [{'case': 'case1'}]) is None
+    assert store.apply_delta('unknown', 0, [{'case': 'case1'}]) is None